@@ -0,0 +1,74 @@
+"""Chunking throughput and peak memory: previous double split vs. SentenceChunker.
+
+The previous upload path built ~1000-char sentence chunks with repeated string
+concatenation, joined them with blank lines, then re-split the result with
+RecursiveCharacterTextSplitter(1024, 80). It is reproduced here for comparison.
+
+    cd backend && python -m benchmarks.bench_chunking --paragraphs 2000
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from chat.services.chunker import SentenceChunker
+from .corpus import paragraph
+
+def legacy_chunks(text: str):
+    text = ' '.join(text.split())
+    sentences = text.replace('? ', '?<split>').replace('! ', '!<split>').replace('. ', '.<split>').split('<split>')
+    chunks = []
+    current_chunk = ""
+    for sentence in sentences:
+        if len(current_chunk) + len(sentence) + 1 < 1000:
+            current_chunk += (sentence + " ").strip()
+        else:
+            chunks.append(current_chunk)
+            current_chunk = sentence + " "
+    if current_chunk:
+        chunks.append(current_chunk)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1024, chunk_overlap=80)
+    return splitter.split_text("\n\n".join(chunks))
+
+def sentence_chunks(pages):
+    return [chunk.text for chunk in SentenceChunker(1024, 80).chunks(pages)]
+
+def measure(name, run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "path": name,
+        "chunks": len(chunks),
+        "seconds": round(elapsed, 4),
+        "chunks_per_sec": round(len(chunks) / elapsed, 1),
+        "peak_mib": round(peak / 2 ** 20, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--paragraphs', type=int, default=2000)
+    parser.add_argument('--paragraphs-per-page', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    paragraphs = [paragraph(rng) for _ in range(args.paragraphs)]
+    step = args.paragraphs_per_page
+    pages = [(i // step + 1, " ".join(paragraphs[i:i + step])) for i in range(0, len(paragraphs), step)]
+    text = "\n".join(page for _, page in pages)
+    print(f"{len(text) / 2 ** 20:.1f} MiB of text, {len(pages)} pages")
+
+    results = [
+        measure("legacy_double_split", lambda: legacy_chunks(text)),
+        measure("sentence_chunker", lambda: sentence_chunks(pages)),
+    ]
+    for row in results:
+        print(f"{row['path']:<22} {row['chunks_per_sec']:>10.1f} chunks/s  peak {row['peak_mib']:>7.2f} MiB")
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Delete latency vs. collection size.
+
+Compares the previous delete path (fetch the whole collection, scan metadata
+in Python, delete by id) with the metadata-filtered delete used by
+VectorStoreService.delete_documents. Vectors are random, so no embedding
+model is needed.
+
+    cd backend && python -m benchmarks.bench_delete --sizes 1000 5000 20000
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+import uuid
+import chromadb
+from chromadb.config import Settings
+
+DIM = 384
+CHUNKS_PER_DOCUMENT = 20
+
+def open_client(path: str):
+    """On-disk client: duckdb+parquet on the pinned chromadb 0.3.x, PersistentClient from 0.4 on."""
+    if hasattr(chromadb, 'PersistentClient'):
+        return chromadb.PersistentClient(path=path)
+    return chromadb.Client(Settings(chroma_db_impl="duckdb+parquet", persist_directory=path,
+                                    anonymized_telemetry=False))
+
+def build_collection(client, size: int):
+    collection = client.create_collection(name=f"bench_{uuid.uuid4().hex}")
+    chroma_ids = []
+    batch_ids, batch_vectors, batch_metadatas = [], [], []
+    for i in range(size):
+        if i % CHUNKS_PER_DOCUMENT == 0:
+            chroma_ids.append(str(uuid.uuid4()))
+        chroma_id = chroma_ids[-1]
+        chunk_id = i % CHUNKS_PER_DOCUMENT
+        batch_ids.append(f"{chroma_id}:{chunk_id}")
+        batch_vectors.append([random.random() for _ in range(DIM)])
+        batch_metadatas.append({"chroma_id": chroma_id, "chunk_id": chunk_id})
+        if len(batch_ids) == 1000:
+            collection.add(ids=batch_ids, embeddings=batch_vectors, metadatas=batch_metadatas)
+            batch_ids, batch_vectors, batch_metadatas = [], [], []
+    if batch_ids:
+        collection.add(ids=batch_ids, embeddings=batch_vectors, metadatas=batch_metadatas)
+    return collection, chroma_ids
+
+def delete_by_scan(collection, chroma_id: str) -> None:
+    results = collection.get()
+    ids = [results['ids'][i] for i, metadata in enumerate(results['metadatas'])
+           if metadata.get('chroma_id') == chroma_id]
+    if ids:
+        collection.delete(ids=ids)
+
+def delete_by_filter(collection, chroma_id: str) -> None:
+    collection.delete(where={"chroma_id": chroma_id})
+
+def measure(delete, collection, chroma_ids, repeats: int) -> float:
+    timings = []
+    for chroma_id in random.sample(chroma_ids, repeats):
+        start = time.perf_counter()
+        delete(collection, chroma_id)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        client = open_client(tmp)
+        for size in args.sizes:
+            row = {"chunks": size}
+            for name, delete in (("scan_ms", delete_by_scan), ("filter_ms", delete_by_filter)):
+                collection, chroma_ids = build_collection(client, size)
+                row[name] = round(measure(delete, collection, chroma_ids, args.repeats), 2)
+                client.delete_collection(collection.name)
+            results.append(row)
+            print(f"{size:>8} chunks  scan {row['scan_ms']:>9.2f}ms  filter {row['filter_ms']:>7.2f}ms")
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""End-to-end latency of the API against a local fake Ollama server.
+
+The corpus grows in steps (--sizes), cycling through PDF, Markdown and text
+files. After each step it measures:
+  - upload: /api/upload/ request time, and documents/MB/chunks per second
+    until every ingestion job is done;
+  - retrieval: VectorStoreService.retrieve with cold caches;
+  - chat: time to first token and total time of /api/chat/, through the
+    fake Ollama (--token-rate, --latency, --tokens).
+At the end, DELETE /api/documents/<id>/ latency is measured on a sample.
+
+Runs with benchmarks.settings (throwaway database, Chroma and embedding
+cache) and the configured embedding model. Results are written as JSON,
+tagged with the git commit, for comparison across commits.
+
+    cd backend && python -m benchmarks.bench_e2e --sizes 3,10,30 --output e2e.json
+"""
+import argparse
+import io
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from .corpus import sentence, write_pdf, write_text
+from .fake_ollama import FakeOllamaServer
+
+EXTENSIONS = ['pdf', 'md', 'txt']
+
+def summarize(timings) -> dict:
+    if not timings:
+        return {"count": 0}
+    timings = sorted(timings)
+    return {
+        "count": len(timings),
+        "median_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[math.ceil(len(timings) * 0.95) - 1], 2),
+        "max_ms": round(timings[-1], 2),
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def setup_django(tmp: str, ollama_url: str) -> None:
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+    os.environ['BENCH_DIR'] = tmp
+    os.environ['BENCH_OLLAMA_HOST'] = ollama_url
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+def make_file(directory: str, index: int, pages: int, seed: int) -> str:
+    extension = EXTENSIONS[index % len(EXTENSIONS)]
+    path = os.path.join(directory, f"doc-{index:05d}.{extension}")
+    if extension == 'pdf':
+        write_pdf(path, pages, seed=seed + index)
+    else:
+        write_text(path, pages * 6, seed=seed + index)
+    return path
+
+def upload(client, paths, timeout: float) -> dict:
+    """Upload files one request at a time, then wait for their ingestion jobs."""
+    request_ms, jobs, document_ids = [], [], []
+    total_bytes = sum(os.path.getsize(path) for path in paths)
+    start = time.perf_counter()
+    for path in paths:
+        with open(path, 'rb') as fh:
+            data = io.BytesIO(fh.read())
+        data.name = os.path.basename(path)
+        request_start = time.perf_counter()
+        response = client.post('/api/upload/', {'file': data})
+        request_ms.append((time.perf_counter() - request_start) * 1000)
+        body = response.json()
+        if response.status_code not in (200, 202):
+            raise RuntimeError(f"Upload of {path} failed: {body}")
+        document_ids.append(body['document_id'])
+        if body.get('job_id'):
+            jobs.append(body['job_id'])
+
+    chunks, failed = 0, 0
+    pending = list(jobs)
+    while pending:
+        if time.perf_counter() - start > timeout:
+            raise RuntimeError(f"{len(pending)} ingestion jobs still running after {timeout}s")
+        still = []
+        for job_id in pending:
+            job = client.get(f'/api/jobs/{job_id}/').json()
+            if job['stage'] == 'done':
+                chunks += job['chunks_done']
+            elif job['stage'] == 'failed':
+                failed += 1
+            else:
+                still.append(job_id)
+        pending = still
+        if pending:
+            time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    return {
+        "documents": len(paths),
+        "failed": failed,
+        "bytes": total_bytes,
+        "chunks": chunks,
+        "seconds": round(elapsed, 3),
+        "documents_per_s": round(len(paths) / elapsed, 2),
+        "mb_per_s": round(total_bytes / 2**20 / elapsed, 3),
+        "chunks_per_s": round(chunks / elapsed, 1),
+        "request": summarize(request_ms),
+        "document_ids": document_ids,
+    }
+
+def retrieval(queries) -> dict:
+    from chat.services.registry import vector_store_service
+    store = vector_store_service()
+    timings = []
+    for query in queries:
+        store.query_cache.clear()
+        store.retrieval_cache.clear()
+        start = time.perf_counter()
+        store.retrieve(query, k=5)
+        timings.append((time.perf_counter() - start) * 1000)
+    return summarize(timings)
+
+def chat(client, queries, model: str) -> dict:
+    """One /api/chat/ request per query, each in a new chat; reads the SSE stream as it arrives."""
+    ttft, total, errors = [], [], 0
+    for query in queries:
+        start = time.perf_counter()
+        response = client.post('/api/chat/', {'message': query, 'chatId': uuid.uuid4().hex, 'model': model},
+                               content_type='application/json')
+        first = None
+        for part in response.streaming_content:
+            text = part.decode() if isinstance(part, bytes) else part
+            if first is None and text.startswith('event: token'):
+                first = time.perf_counter()
+            if text.startswith('event: error'):
+                errors += 1
+        end = time.perf_counter()
+        if first is not None:
+            ttft.append((first - start) * 1000)
+        total.append((end - start) * 1000)
+    return {"ttft": summarize(ttft), "total": summarize(total), "errors": errors}
+
+def delete(client, document_ids) -> dict:
+    timings = []
+    for document_id in document_ids:
+        start = time.perf_counter()
+        response = client.delete(f'/api/documents/{document_id}/')
+        if response.status_code == 204:
+            timings.append((time.perf_counter() - start) * 1000)
+    return summarize(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='3,10,30', help="Cumulative corpus sizes, in documents")
+    parser.add_argument('--pages', type=int, default=4, help="Pages per PDF (text files get 6 paragraphs per page)")
+    parser.add_argument('--queries', type=int, default=20, help="Retrieval queries per step")
+    parser.add_argument('--chats', type=int, default=5, help="Chat requests per step")
+    parser.add_argument('--deletes', type=int, default=10)
+    parser.add_argument('--model', default='llama3.1:8b')
+    parser.add_argument('--token-rate', type=float, default=200.0)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--tokens', type=int, default=32)
+    parser.add_argument('--timeout', type=float, default=600, help="Seconds to wait for a step's ingestion")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="JSON file to write (default: print only)")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    rng = random.Random(args.seed)
+    results = {
+        "commit": git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(),
+        "config": vars(args),
+        "steps": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeOllamaServer(token_rate=args.token_rate, latency=args.latency, tokens=args.tokens,
+                             models=[args.model]) as ollama:
+        setup_django(tmp, ollama.url)
+        import logging
+        logging.disable(logging.INFO)
+        from django.test import Client
+        client = Client()
+        corpus_dir = os.path.join(tmp, 'corpus')
+        os.makedirs(corpus_dir)
+
+        document_ids = []
+        for size in sizes:
+            paths = [make_file(corpus_dir, index, args.pages, args.seed) for index in range(len(document_ids), size)]
+            step = {"corpus_documents": size, "upload": upload(client, paths, args.timeout)}
+            document_ids.extend(step["upload"].pop("document_ids"))
+            step["retrieval"] = retrieval([sentence(rng) for _ in range(args.queries)])
+            step["chat"] = chat(client, [sentence(rng) + "?" for _ in range(args.chats)], args.model)
+            results["steps"].append(step)
+            print(f"{size:>6} docs  upload {step['upload']['documents_per_s']:>7.2f} docs/s "
+                  f"{step['upload']['chunks_per_s']:>8.1f} chunks/s  "
+                  f"retrieval median {step['retrieval'].get('median_ms', 0):>7.2f}ms  "
+                  f"ttft median {step['chat']['ttft'].get('median_ms', 0):>8.2f}ms  "
+                  f"total median {step['chat']['total'].get('median_ms', 0):>8.2f}ms")
+
+        results["delete"] = delete(client, rng.sample(document_ids, min(args.deletes, len(document_ids))))
+        results["ollama_requests"] = ollama.requests
+        print(f"delete median {results['delete'].get('median_ms', 0):.2f}ms over {results['delete']['count']} documents")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            json.dump(results, out, indent=2)
+        print(f"Wrote {args.output}")
+    else:
+        print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Embedding throughput and memory per backend (chat.services.embedding_backend).
+
+Each configuration runs in a fresh interpreter so RSS is not shared. It
+reports the model load time, embeddings/sec over synthetic chunk-sized
+texts (one warm-up batch excluded), and the RSS after loading and at the peak.
+
+    cd backend && python -m benchmarks.bench_embeddings --texts 2000 \\
+        --config fastembed:BAAI/bge-small-en-v1.5 \\
+        --config sentence-transformers:sentence-transformers/all-MiniLM-L6-v2
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+CHILD = r"""
+import json, os, random, resource, sys, time
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rag_chat.settings')
+backend, model_name, texts, batch_size, threads = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), int(sys.argv[5]) or None
+
+def rss_mb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+from benchmarks.corpus import paragraph
+from chat.services.embedding_backend import build_base_embeddings
+rng = random.Random(0)
+corpus = [paragraph(rng, 8) for _ in range(texts)]
+rss_start = rss_mb()
+start = time.perf_counter()
+embeddings = build_base_embeddings(backend, model_name, batch_size=batch_size, threads=threads)
+load_s = time.perf_counter() - start
+rss_loaded = rss_mb()
+embeddings.embed_documents(corpus[:batch_size])  # Warm-up
+start = time.perf_counter()
+vectors = embeddings.embed_documents(corpus)
+embed_s = time.perf_counter() - start
+start = time.perf_counter()
+for text in corpus[:50]:
+    embeddings.embed_query(text[:80])
+query_ms = (time.perf_counter() - start) * 1000 / 50
+print(json.dumps({
+    'load_s': round(load_s, 2),
+    'embeddings_per_s': round(len(vectors) / embed_s, 1),
+    'query_ms': round(query_ms, 2),
+    'dim': len(vectors[0]),
+    'model_rss_mb': round(rss_loaded - rss_start, 1),
+    'rss_mb': round(rss_mb(), 1),
+    'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+}))
+"""
+
+def run(config: str, texts: int, batch_size: int, threads: int) -> dict:
+    backend, model_name = config.split(':', 1)
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD, backend, model_name, str(texts), str(batch_size), str(threads or 0)],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    row = {'backend': backend, 'model': model_name, 'batch_size': batch_size, 'threads': threads}
+    if result.returncode != 0:
+        row['error'] = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed'
+        return row
+    row.update(json.loads(result.stdout.strip().splitlines()[-1]))
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', action='append', dest='configs',
+                        help="backend:model (repeatable; default the fastembed and sentence-transformers defaults)")
+    parser.add_argument('--texts', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, action='append', dest='batch_sizes')
+    parser.add_argument('--threads', type=int, default=0, help="Intra-op threads, 0 for the runtime default")
+    args = parser.parse_args()
+    configs = args.configs or [
+        'fastembed:BAAI/bge-small-en-v1.5',
+        'sentence-transformers:sentence-transformers/all-MiniLM-L6-v2',
+    ]
+
+    results = []
+    for config in configs:
+        for batch_size in args.batch_sizes or [64]:
+            row = run(config, args.texts, batch_size, args.threads)
+            results.append(row)
+            if 'error' in row:
+                print(f"{config:>60}  batch {batch_size:>4}  error: {row['error']}")
+                continue
+            print(f"{config:>60}  batch {batch_size:>4}  {row['embeddings_per_s']:>8.1f} emb/s  "
+                  f"query {row['query_ms']:>6.2f}ms  load {row['load_s']:>5.2f}s  "
+                  f"model RSS {row['model_rss_mb']:>7.1f}MB  peak {row['peak_rss_mb']:>7.1f}MB")
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""PDF extraction throughput (pages/sec) vs. process pool size.
+
+Runs ExtractionEngine over a PDF with each worker count and checks the pages
+come back complete and in order. Without --pdf a synthetic PDF is generated.
+
+    cd backend && python -m benchmarks.bench_extraction --pages 200 --workers 1 2 4
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from chat.services.extraction_engine import ExtractionEngine, pdf_page_count
+from .corpus import write_pdf
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pdf', help='PDF to extract (default: synthetic)')
+    parser.add_argument('--pages', type=int, default=200, help='pages of the synthetic PDF')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--pages-per-task', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.pdf
+        if not path:
+            path = os.path.join(tmp, 'synthetic.pdf')
+            write_pdf(path, args.pages)
+        page_count = pdf_page_count(path)
+
+        results = []
+        for workers in args.workers:
+            engine = ExtractionEngine(max_workers=workers, pages_per_task=args.pages_per_task)
+            # Start the pool outside the timing
+            if workers > 1:
+                engine._pool().submit(pdf_page_count, path).result()
+            start = time.perf_counter()
+            numbers = [page_number for page_number, _ in engine.iter_pdf_pages(path, page_count)]
+            elapsed = time.perf_counter() - start
+            engine.shutdown()
+
+            assert numbers == sorted(numbers), "pages came back out of order"
+            results.append({
+                "workers": workers,
+                "pages": len(numbers),
+                "seconds": round(elapsed, 3),
+                "pages_per_sec": round(len(numbers) / elapsed, 1),
+            })
+            print(f"{workers:>3} workers  {results[-1]['pages_per_sec']:>8.1f} pages/s")
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Recall@k and latency of the vector, lexical and hybrid retrieval modes.
+
+Each synthetic chunk mentions one identifier (hostname, error code or config
+key). Two query sets are run against VectorStoreService.retrieve:
+'identifier' asks about the identifier, 'content' repeats a few words of one
+of the chunk's sentences. A query counts as recalled when its chunk is in the
+top k. Runs against a throwaway database, Chroma directory and embedding cache,
+with the configured embedding model.
+
+    cd backend && python -m benchmarks.bench_retrieval --chunks 1000 --queries 200
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+def setup_django(tmp: str) -> None:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rag_chat.settings')
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = os.path.join(tmp, 'db.sqlite3')
+    settings.CHROMA_SETTINGS['persist_directory'] = os.path.join(tmp, 'chroma')
+    settings.EMBEDDING_CACHE_PATH = os.path.join(tmp, 'embedding_cache.sqlite3')
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+def build_corpus(vector_store_service, chunks: int, seed: int):
+    """Index the synthetic chunks. Return (chunk id, identifier, one sentence) per chunk."""
+    from langchain.schema import Document
+    from chat.models import Document as DBDocument
+    from .corpus import identifier, sentence
+
+    rng = random.Random(seed)
+    document = DBDocument.objects.create(name="bench.txt", file_type="txt", content="", chroma_id="bench")
+    truth, batch = [], []
+    for chunk_id in range(chunks):
+        name = identifier(rng)
+        sentences = [sentence(rng) for _ in range(6)]
+        key_sentence = rng.choice(sentences)
+        sentences.insert(rng.randrange(len(sentences)), f"See {name} for details.")
+        batch.append(Document(page_content=" ".join(sentences), metadata={
+            "filename": document.name, "id": str(document.id), "chroma_id": document.chroma_id, "chunk_id": chunk_id
+        }))
+        truth.append((f"{document.chroma_id}:{chunk_id}", name, key_sentence))
+        if len(batch) == 256:
+            vector_store_service.add_documents(batch, persist=False)
+            batch = []
+    if batch:
+        vector_store_service.add_documents(batch, persist=False)
+    return truth
+
+def queries(truth, count: int, seed: int):
+    rng = random.Random(seed)
+    sample = rng.sample(truth, min(count, len(truth)))
+    identifier_queries = [(f"What do we know about {name}?", chunk_id) for chunk_id, name, _ in sample]
+    content_queries = []
+    for chunk_id, _, key_sentence in sample:
+        words = key_sentence.rstrip('.').split()
+        start = rng.randrange(max(1, len(words) - 6))
+        content_queries.append((" ".join(words[start:start + 6]), chunk_id))
+    return {"identifier": identifier_queries, "content": content_queries}
+
+def measure(vector_store_service, query_set, mode: str, k: int) -> dict:
+    recalled, timings = 0, []
+    for query, chunk_id in query_set:
+        # Cold caches: every mode pays for its own embedding and search
+        vector_store_service.query_cache.clear()
+        vector_store_service.retrieval_cache.clear()
+        start = time.perf_counter()
+        result = vector_store_service.retrieve(query, k=k, score_threshold=0.0, mode=mode)
+        timings.append((time.perf_counter() - start) * 1000)
+        recalled += chunk_id in result.ids
+    timings.sort()
+    return {
+        "recall_at_k": round(recalled / len(query_set), 3),
+        "median_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chunks', type=int, default=1000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(tmp)
+        import logging
+        logging.disable(logging.INFO)
+        from chat.services.vector_store_service import VectorStoreService, RETRIEVAL_MODES
+
+        vector_store_service = VectorStoreService()
+        start = time.perf_counter()
+        truth = build_corpus(vector_store_service, args.chunks, args.seed)
+        print(f"Indexed {len(truth)} chunks in {time.perf_counter() - start:.1f}s")
+
+        results = []
+        for set_name, query_set in queries(truth, args.queries, args.seed + 1).items():
+            for mode in RETRIEVAL_MODES:
+                row = {"queries": set_name, "mode": mode, "k": args.k}
+                row.update(measure(vector_store_service, query_set, mode, args.k))
+                results.append(row)
+                print(f"{set_name:>10} {mode:>8}  recall@{args.k} {row['recall_at_k']:.3f}  "
+                      f"median {row['median_ms']:>7.2f}ms  p95 {row['p95_ms']:>7.2f}ms")
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
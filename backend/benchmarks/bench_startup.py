@@ -0,0 +1,92 @@
+"""Cold start cost of a backend process: Django setup, URLconf import and first requests.
+
+Every run is a fresh interpreter against a throwaway database, Chroma
+directory and embedding cache. It times django.setup(), importing the
+URLconf (chat.views), a first request that needs no service
+(/api/documents/) and a first request that builds the vector store
+(/api/stats/), and lists which heavy modules the URLconf import pulled in.
+Startup warm-up is disabled so the first requests pay for lazy initialization.
+
+    cd backend && python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HEAVY_MODULES = ['torch', 'sentence_transformers', 'fastembed', 'chromadb', 'langchain_community', 'PyPDF2']
+
+CHILD = r"""
+import json, os, sys, time
+tmp = sys.argv[1]
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rag_chat.settings')
+timings = {}
+start = time.perf_counter()
+from django.conf import settings
+settings.DATABASES['default']['NAME'] = os.path.join(tmp, 'db.sqlite3')
+settings.CHROMA_SETTINGS['persist_directory'] = os.path.join(tmp, 'chroma')
+settings.EMBEDDING_CACHE_PATH = os.path.join(tmp, 'embedding_cache.sqlite3')
+settings.WARMUP_ON_STARTUP = False
+settings.ALLOWED_HOSTS = ['testserver']
+import django
+django.setup()
+timings['setup_ms'] = (time.perf_counter() - start) * 1000
+if sys.argv[2] == 'migrate':
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    sys.exit(0)
+
+start = time.perf_counter()
+import rag_chat.urls
+timings['urls_import_ms'] = (time.perf_counter() - start) * 1000
+heavy = [name for name in json.loads(sys.argv[3]) if name in sys.modules]
+
+from django.test import Client
+client = Client(raise_request_exception=False)
+for name, url in [('first_light_request_ms', '/api/documents/'), ('first_service_request_ms', '/api/stats/')]:
+    start = time.perf_counter()
+    response = client.get(url)
+    timings[name] = (time.perf_counter() - start) * 1000
+    if response.status_code != 200:
+        timings[name] = None
+print(json.dumps({'timings': timings, 'heavy_modules_after_urls': heavy}))
+"""
+
+def run_child(tmp: str, mode: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD, tmp, mode, json.dumps(HEAVY_MODULES)],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1]) if mode == 'measure' else {}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run_child(tmp, 'migrate')
+        runs = [run_child(tmp, 'measure') for _ in range(args.runs)]
+
+    results = {}
+    for key in runs[0]['timings']:
+        values = [run['timings'][key] for run in runs if run['timings'][key] is not None]
+        results[key] = {
+            'median_ms': round(statistics.median(values), 1) if values else None,
+            'max_ms': round(max(values), 1) if values else None,
+        }
+        if values:
+            print(f"{key:>26}  median {results[key]['median_ms']:>8.1f}ms  max {results[key]['max_ms']:>8.1f}ms")
+        else:
+            print(f"{key:>26}  failed")
+    results['heavy_modules_after_urls'] = runs[0]['heavy_modules_after_urls']
+    print(f"Heavy modules loaded by the URLconf: {', '.join(results['heavy_modules_after_urls']) or 'none'}")
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
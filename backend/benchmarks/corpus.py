@@ -0,0 +1,71 @@
+"""Synthetic documents for the benchmarks."""
+import random
+
+WORDS = (
+    "server cluster backup restore config network proxy latency timeout "
+    "certificate database index replica volume mount service daemon kernel "
+    "package upgrade rollback deploy monitor alert threshold queue worker "
+    "le la les un une des pour avec dans sur procédure serveur sauvegarde"
+).split()
+
+def sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+    return " ".join(words).capitalize() + "."
+
+def paragraph(rng: random.Random, sentences: int = 6) -> str:
+    return " ".join(sentence(rng) for _ in range(sentences))
+
+def identifier(rng: random.Random) -> str:
+    """A hostname, error code or config key, the kind of token dense retrieval tends to miss."""
+    kind = rng.randrange(3)
+    if kind == 0:
+        return f"srv-{rng.randrange(10000):04d}.{rng.choice(['prod', 'staging', 'dev'])}.local"
+    if kind == 1:
+        return f"ERR-{rng.randrange(100000):05d}"
+    return f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{rng.randrange(100)}"
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path: str, pages: int, lines_per_page: int = 40, seed: int = 0) -> None:
+    """Write a plain-text PDF (Helvetica, one Tj per line) that pdfplumber can extract."""
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages, filled once the page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    page_ids = []
+    for _ in range(pages):
+        lines = []
+        for i in range(lines_per_page):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(8, 14))]
+            lines.append(f"1 0 0 1 40 {800 - i * 18} Tm ({_pdf_escape(' '.join(words))}.) Tj")
+        stream = ("BT /F1 10 Tf\n" + "\n".join(lines) + "\nET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode()
+
+    with open(path, "wb") as out:
+        out.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(out.tell())
+            out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref = out.tell()
+        out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            out.write(b"%010d 00000 n \n" % offset)
+        out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+def write_text(path: str, paragraphs: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as out:
+        for _ in range(paragraphs):
+            out.write(paragraph(rng) + "\n\n")
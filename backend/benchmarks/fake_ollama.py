@@ -0,0 +1,169 @@
+"""A local stand-in for the Ollama HTTP API, for benchmarks that must not depend on a GPU box.
+
+Serves /api/generate (streamed or not), /api/chat, /api/tags and
+/api/version. Every generation waits `latency` seconds before its first
+token (plus `load_ms` the first time a model is used, like a cold load),
+then emits `tokens` tokens at `token_rate` tokens per second, with the
+same timing fields as Ollama's final chunk.
+
+    cd backend && python -m benchmarks.fake_ollama --port 11435 --token-rate 40 --latency 0.2
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = "the service restarts after the backup completes and the replica catches up".split()
+
+class FakeOllamaServer:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, token_rate: float = 50.0,
+                 latency: float = 0.1, tokens: int = 64, load_ms: float = 0.0,
+                 models=('llama3.1:8b',)):
+        self.token_rate = token_rate
+        self.latency = latency
+        self.tokens = tokens
+        self.load_ms = load_ms
+        self.models = list(models)
+        self.requests = 0
+        self._loaded = set()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeOllamaServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-ollama', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _load_seconds(self, model: str) -> float:
+        with self._lock:
+            self.requests += 1
+            if model in self._loaded:
+                return 0.0
+            self._loaded.add(model)
+        return self.load_ms / 1000
+
+    def _generate(self, model: str, prompt: str):
+        """Yield (text, final fields or None) as the tokens become due."""
+        start = time.perf_counter()
+        load_s = self._load_seconds(model)
+        time.sleep(load_s + self.latency)
+        prompt_eval_s = time.perf_counter() - start - load_s
+        eval_start = time.perf_counter()
+        for i in range(self.tokens if prompt else 0):
+            yield WORDS[i % len(WORDS)] + " ", None
+            time.sleep(1 / self.token_rate)
+        total_s = time.perf_counter() - start
+        yield "", {
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int(total_s * 1e9),
+            "load_duration": int(load_s * 1e9),
+            "prompt_eval_count": max(1, len(prompt) // 4),
+            "prompt_eval_duration": int(prompt_eval_s * 1e9),
+            "eval_count": self.tokens if prompt else 0,
+            "eval_duration": int((time.perf_counter() - eval_start) * 1e9),
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, payload, status=200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == '/api/version':
+                    return self._json({"version": "0.0.0-fake"})
+                if self.path == '/api/tags':
+                    return self._json({"models": [{
+                        "name": model, "model": model,
+                        "modified_at": datetime.now(timezone.utc).isoformat(),
+                        "size": 4_920_753_328, "digest": "0" * 64,
+                        "details": {"format": "gguf", "family": "llama", "families": ["llama"],
+                                    "parameter_size": "8.0B", "quantization_level": "Q4_K_M"},
+                    } for model in server.models]})
+                self._json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if self.path == '/api/generate':
+                    prompt, key = body.get('prompt', ''), 'response'
+                elif self.path == '/api/chat':
+                    prompt = "\n".join(m.get('content', '') for m in body.get('messages', []))
+                    key = 'message'
+                else:
+                    return self._json({"error": "not found"}, 404)
+
+                def part(text, final):
+                    data = {"model": body.get('model'), "created_at": datetime.now(timezone.utc).isoformat()}
+                    data[key] = text if key == 'response' else {"role": "assistant", "content": text}
+                    data.update(final or {"done": False})
+                    return data
+
+                if not body.get('stream', True):
+                    text, final = "", None
+                    for token, final in server._generate(body.get('model'), prompt):
+                        text += token
+                    return self._json(part(text, final))
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for token, final in server._generate(body.get('model'), prompt):
+                    line = (json.dumps(part(token, final)) + "\n").encode()
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--token-rate', type=float, default=50.0, help="Tokens per second")
+    parser.add_argument('--latency', type=float, default=0.1, help="Seconds before the first token")
+    parser.add_argument('--tokens', type=int, default=64, help="Tokens per answer")
+    parser.add_argument('--load-ms', type=float, default=0.0, help="Extra delay of a model's first request")
+    parser.add_argument('--model', action='append', dest='models', help="Listed model (repeatable)")
+    args = parser.parse_args()
+    server = FakeOllamaServer(args.host, args.port, args.token_rate, args.latency, args.tokens,
+                              args.load_ms, args.models or ['llama3.1:8b'])
+    print(f"Fake Ollama listening on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == '__main__':
+    main()
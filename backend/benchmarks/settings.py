@@ -0,0 +1,35 @@
+"""Settings for the end-to-end benchmarks: rag_chat.settings on throwaway storage and a local Ollama.
+
+BENCH_DIR (default: a new temporary directory) holds the database, Chroma
+and the embedding cache. BENCH_OLLAMA_HOST points at benchmarks.fake_ollama.
+
+    DJANGO_SETTINGS_MODULE=benchmarks.settings
+"""
+import os
+import tempfile
+from rag_chat.settings import *  # noqa: F401,F403
+
+BENCH_DIR = os.environ.get('BENCH_DIR') or tempfile.mkdtemp(prefix='ragadmin-bench-')
+
+DEBUG = False
+ALLOWED_HOSTS = ['testserver', 'localhost', '127.0.0.1']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BENCH_DIR, 'db.sqlite3'),
+    }
+}
+MEDIA_ROOT = os.path.join(BENCH_DIR, 'media')
+CHROMA_DB_DIR = os.path.join(BENCH_DIR, 'chroma')
+CHROMA_SETTINGS = {
+    "persist_directory": CHROMA_DB_DIR,
+    "anonymized_telemetry": False
+}
+EMBEDDING_CACHE_PATH = os.path.join(BENCH_DIR, 'embedding_cache.sqlite3')
+
+OLLAMA_HOST = os.environ.get('BENCH_OLLAMA_HOST', 'http://127.0.0.1:11435')
+OLLAMA_PRELOAD_MODELS = []
+WARMUP_ON_STARTUP = False
+# Every chat reaches the model, so time to first token is measured each time
+ANSWER_CACHE_ENABLED = False
@@ -1,25 +1,38 @@
 from django.apps import AppConfig
+from django.conf import settings
 import logging
+import os
+import sys
 
 logger = logging.getLogger(__name__)
 
+# Set to '1' by the rag_chat.asgi and rag_chat.wsgi entry points (gunicorn, uvicorn, daphne...);
+# '0' disables the startup warmup of a server
+SERVER_FLAG = 'RAGADMIN_SERVER'
+
+def is_serving() -> bool:
+    """True in a web server process only.
+
+    That is a process started through rag_chat.asgi/wsgi, or the serving
+    child of manage.py runserver. Other commands, tests, workers and scripts
+    are not servers.
+    """
+    flag = os.environ.get(SERVER_FLAG)
+    if flag is not None:
+        return flag == '1'
+    if os.path.basename(sys.argv[0]) == 'manage.py' and sys.argv[1:2] == ['runserver']:
+        # With the autoreloader, only the child (RUN_MAIN) serves
+        return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv
+    return False
+
 class ChatConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'chat'
 
     def ready(self):
-        try:
-            # Import and initialize services only when not running migrations
-            from django.db import connection
-            if connection.connection is not None:
-                from .services.vector_store_service import VectorStoreService
-                from .services.document_service import DocumentService
-                from .services.chat_service import ChatService
-                
-                logger.info("Initializing services...")
-                vector_store_service = VectorStoreService()
-                document_service = DocumentService()
-                chat_service = ChatService(vector_store_service)
-                logger.info("Services initialized successfully")
-        except Exception as e:
-            logger.error(f"Error initializing services: {str(e)}")
+        # Services are built on first use (chat.services.registry); a server can
+        # warm them up in the background so the first request does not wait
+        if getattr(settings, 'WARMUP_ON_STARTUP', False) and is_serving():
+            from .services.registry import warmup_in_background
+            logger.info("Warming up services in the background...")
+            warmup_in_background()
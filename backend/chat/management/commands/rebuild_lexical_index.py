@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from langchain.schema import Document as LangchainDocument
+from chat.models import Document, DocumentChunk
+from chat.services.vector_store_service import VectorStoreService
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text chunk index from the chunks stored in Chroma."
+
+    def handle(self, *args, **options):
+        vector_store_service = VectorStoreService()
+        collection = vector_store_service.vector_store._collection
+        total = 0
+        for document in Document.objects.exclude(chroma_id=None).iterator():
+            found = collection.get(where={"chroma_id": document.chroma_id}, include=["documents", "metadatas"])
+            chunks = [
+                LangchainDocument(page_content=text, metadata={**(metadata or {}), "id": str(document.id)})
+                for text, metadata in zip(found["documents"], found["metadatas"])
+            ]
+            DocumentChunk.objects.filter(document=document).delete()
+            total += vector_store_service.lexical_index.add(chunks, found["ids"])
+            self.stdout.write(f"{document.name}: {len(chunks)} chunks")
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} chunks"))
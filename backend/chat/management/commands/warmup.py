@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from chat.services.registry import warmup
+
+class Command(BaseCommand):
+    help = "Build the chat services and load the preload models into Ollama, reporting the time of each step."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', dest='models',
+                            help="Model to warm up (repeatable; default OLLAMA_PRELOAD_MODELS)")
+        parser.add_argument('--no-ollama', action='store_true', help="Do not load the models into Ollama")
+
+    def handle(self, *args, **options):
+        timings = warmup(options['models'], preload_ollama=not options['no_ollama'])
+        for step, seconds in timings.items():
+            self.stdout.write(f"{step}: {seconds:.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"Warmed up {len(timings)} steps in {sum(timings.values()):.2f}s"))
@@ -0,0 +1,45 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_document_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chunk_id', models.CharField(max_length=255, unique=True)),
+                ('content', models.TextField()),
+                ('metadata', models.JSONField()),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='chat.document')),
+            ],
+        ),
+        # External-content FTS5 index over the chunk text, kept in sync by triggers
+        migrations.RunSQL(
+            sql=[
+                "CREATE VIRTUAL TABLE chat_documentchunk_fts USING fts5("
+                "content, content='chat_documentchunk', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2')",
+                "CREATE TRIGGER chat_documentchunk_ai AFTER INSERT ON chat_documentchunk BEGIN "
+                "INSERT INTO chat_documentchunk_fts(rowid, content) VALUES (new.id, new.content); END",
+                "CREATE TRIGGER chat_documentchunk_ad AFTER DELETE ON chat_documentchunk BEGIN "
+                "INSERT INTO chat_documentchunk_fts(chat_documentchunk_fts, rowid, content) "
+                "VALUES ('delete', old.id, old.content); END",
+                "CREATE TRIGGER chat_documentchunk_au AFTER UPDATE ON chat_documentchunk BEGIN "
+                "INSERT INTO chat_documentchunk_fts(chat_documentchunk_fts, rowid, content) "
+                "VALUES ('delete', old.id, old.content); "
+                "INSERT INTO chat_documentchunk_fts(rowid, content) VALUES (new.id, new.content); END",
+            ],
+            reverse_sql=[
+                "DROP TRIGGER IF EXISTS chat_documentchunk_au",
+                "DROP TRIGGER IF EXISTS chat_documentchunk_ad",
+                "DROP TRIGGER IF EXISTS chat_documentchunk_ai",
+                "DROP TABLE IF EXISTS chat_documentchunk_fts",
+            ],
+        ),
+    ]
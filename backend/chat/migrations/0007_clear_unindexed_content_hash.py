@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def clear_unindexed_hashes(apps, schema_editor):
+    # Uploads used to record their hash before ingestion, and the content once indexed.
+    # Chunks without content mean a crash or restart interrupted the ingestion: such
+    # documents must not keep blocking re-uploads of the file. Empty documents without
+    # chunks may be fully indexed files with no text, so they keep their hash
+    Document = apps.get_model('chat', 'Document')
+    Document.objects.filter(content='', chunks__isnull=False).exclude(content_hash=None).update(content_hash=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0006_document_page_offsets'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_unindexed_hashes, migrations.RunPython.noop),
+    ]
@@ -6,10 +6,62 @@ class Document(models.Model):
     upload_date = models.DateTimeField(auto_now_add=True)
     content = models.TextField()
     chroma_id = models.CharField(max_length=255, unique=True, null=True)
+    content_hash = models.CharField(max_length=64, null=True, db_index=True)  # sha256 of the uploaded file
+    # [page number, character offset in content] of each page, for page-based reads
+    page_offsets = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the document list, per sort order
+            models.Index(fields=['upload_date', 'id'], name='chat_doc_upload_date_id_idx'),
+            models.Index(fields=['name', 'id'], name='chat_doc_name_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+class DocumentChunk(models.Model):
+    """Text of one indexed chunk, mirrored into the chat_documentchunk_fts full-text index."""
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='chunks')
+    chunk_id = models.CharField(max_length=255, unique=True)  # Id of the chunk in Chroma
+    content = models.TextField()
+    metadata = models.JSONField()
+
+    def __str__(self):
+        return self.chunk_id
+
+class CollectionGeneration(models.Model):
+    """Change counter of a vector store collection, shared by every worker process."""
+    collection = models.CharField(max_length=255, unique=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.collection} generation {self.value}"
+
+class ChatSession(models.Model):
+    """Server-side state of a chat; its messages are append-only ChatTurn rows."""
+    chat_id = models.CharField(max_length=255, unique=True)
+    message_count = models.PositiveIntegerField(default=0)
+    last_active = models.DateTimeField(db_index=True)
+    # Rolling summary of the first `summarized` messages, shared by every model answering the chat
+    summary = models.TextField(blank=True, default='')
+    summarized = models.PositiveIntegerField(default=0)
+    summary_hash = models.CharField(max_length=64, blank=True, default='')  # Hash of the summarized messages
+
+    def __str__(self):
+        return f"ChatSession {self.chat_id}"
+
+class ChatTurn(models.Model):
+    session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, related_name='turns')
+    index = models.PositiveIntegerField()  # Position of the message in the chat
+    role = models.CharField(max_length=10)  # 'human' or 'assistant'
+    content = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'index'], name='unique_chat_turn_index'),
+        ]
+
 class SharedChat(models.Model):
     chat_id = models.CharField(max_length=255, unique=True)
     history = models.JSONField()
@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    embedding: np.ndarray  # Unit-normalised query embedding
+    chroma_ids: FrozenSet[str]  # Documents the sources belong to
+    created_at: float
+
+@dataclass
+class AnswerCacheHit:
+    answer: str
+    similarity: float
+    age_seconds: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"hit": True, "similarity": self.similarity, "age_seconds": self.age_seconds}
+
+class AnswerCache:
+    """Semantic cache of generated answers.
+
+    Answers are grouped by model and by the exact set of retrieved chunk ids;
+    a lookup returns the stored answer whose query embedding is the most
+    similar, if it reaches similarity_threshold (cosine). Entries expire after
+    ttl seconds and the least recently used ones are evicted beyond max_size.
+    """
+
+    def __init__(self, max_size: int = 512, ttl: float = 3600, similarity_threshold: float = 0.95):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()  # (model, chunk ids, entry number) -> CachedAnswer, least recently used first
+        self._buckets = {}  # (model, chunk ids) -> entry keys
+        self._next_entry = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, key) -> None:
+        self._entries.pop(key, None)
+        bucket = self._buckets.get(key[:2])
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[key[:2]]
+
+    def lookup(self, model_name: str, chunk_ids: Iterable[str], embedding) -> Optional[AnswerCacheHit]:
+        """Return the cached answer for a near-duplicate query with the same sources, if any."""
+        bucket_key = (model_name, frozenset(chunk_ids))
+        query = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            best_key, best_similarity = None, self.similarity_threshold
+            for key in list(self._buckets.get(bucket_key, ())):
+                entry = self._entries[key]
+                if now - entry.created_at > self.ttl:
+                    self._remove(key)
+                    self.evictions += 1
+                    continue
+                similarity = float(np.dot(query, entry.embedding))
+                if similarity >= best_similarity:
+                    best_key, best_similarity = key, similarity
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            entry = self._entries[best_key]
+            return AnswerCacheHit(entry.answer, best_similarity, now - entry.created_at)
+
+    def store(self, model_name: str, chunk_ids: Iterable[str], chroma_ids: Iterable[str], embedding, answer: str) -> None:
+        bucket_key = (model_name, frozenset(chunk_ids))
+        with self._lock:
+            key = bucket_key + (self._next_entry,)
+            self._next_entry += 1
+            self._entries[key] = CachedAnswer(answer, self._normalize(embedding), frozenset(chroma_ids), time.time())
+            self._buckets.setdefault(bucket_key, set()).add(key)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_documents(self, chroma_ids: Iterable[str]) -> int:
+        """Drop every answer built on one of these documents. Return the number dropped."""
+        chroma_ids = set(chroma_ids)
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry.chroma_ids & chroma_ids]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+        if stale:
+            logger.info(f"Invalidated {len(stale)} cached answers")
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'similarity_threshold': self.similarity_threshold,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
@@ -1,45 +1,32 @@
-from langchain_community.llms import Ollama
-from langchain_community.vectorstores import Chroma
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.chains import create_retrieval_chain
 from langchain.prompts import PromptTemplate
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.chains.history_aware_retriever import create_history_aware_retriever
 from django.conf import settings
+from asgiref.sync import sync_to_async
+from .context_router import build_context_router
+from .context_packer import ContextPacker, estimate_tokens
+from .history_manager import HistoryManager
+from .session_store import SessionStore
+from .ollama_client import PooledOllama, OllamaMetricsHandler, keep_alive_for, ollama_metrics
+from .vector_store_service import RetrievalResult
+from .metrics import span, llm_seconds, chat_requests, log_payload
 import logging
-from sentence_transformers import SentenceTransformer
+import time
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
 logger = logging.getLogger(__name__)
 
 class ChatService:
-    def __init__(self, vector_store_service, model_name="llama2"):
+    def __init__(self, vector_store_service, model_name="llama2", answer_cache=None, session_store=None):
         self.vector_store_service = vector_store_service
-        self.chat_histories = {}  # Dictionary to store histories for each chat ID
+        self.answer_cache = answer_cache  # Shared AnswerCache, None to always generate
+        self.session_store = session_store or SessionStore()  # Chat histories, shared between services
         self.model_name = model_name
-        self.llm = Ollama(model=self.model_name)
-        
-        # Initialiser l'encoder une seule fois
-        self.encoder = SentenceTransformer("paraphrase-mpnet-base-v2")
-        
-        # Définir la fonction d'embedding personnalisée
-        self.embedding_function = lambda texts: self.encoder.encode(texts).tolist()
-        
-        # Configurer ChromaDB avec la fonction d'embedding personnalisée
-        self.vector_store = Chroma(
-            collection_name="documents",
-            embedding_function=self.embedding_function
-        )
-        
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1024,
-            chunk_overlap=80,
-            length_function=len,
-            is_separator_regex=False
-        )
+        # Shares the process-wide pooled HTTP client to settings.OLLAMA_HOST
+        self.llm = PooledOllama(model=self.model_name, keep_alive=keep_alive_for(self.model_name))
         
         self.raw_prompt = PromptTemplate.from_template(
             """
@@ -69,203 +56,312 @@ class ChatService:
             """
         )
 
-    def should_use_context(self, query: str) -> bool:
-        """Determine if the query needs document context."""
-        context_check_prompt = PromptTemplate.from_template(
+        # Decides whether a query needs the documents (see settings.CHAT_CONTEXT_ROUTER)
+        self.context_router = build_context_router(self.vector_store_service, self.llm)
+
+        # Fits the retrieved chunks in this model's context token budget
+        budgets = getattr(settings, 'CONTEXT_TOKEN_BUDGETS', {})
+        self.context_packer = ContextPacker(
+            token_budget=budgets.get(self.model_name, getattr(settings, 'CONTEXT_TOKEN_BUDGET', 2048)),
+            duplicate_threshold=getattr(settings, 'CONTEXT_DUPLICATE_THRESHOLD', 0.85)
+        )
+        # Latest turns verbatim, older ones folded into a rolling summary stored with the chat
+        self.history_manager = HistoryManager(
+            self.llm,
+            self.session_store,
+            keep_turns=getattr(settings, 'CHAT_HISTORY_KEEP_TURNS', 4),
+            token_budget=getattr(settings, 'CHAT_HISTORY_TOKEN_BUDGET', 1024),
+            summary_tokens=getattr(settings, 'CHAT_HISTORY_SUMMARY_TOKENS', 256),
+            batch_tokens=getattr(settings, 'CHAT_HISTORY_SUMMARY_BATCH_TOKENS', 2048)
+        )
+
+        # Moving average of time to first token per prompt token, to price the tokens saved
+        self._prefill_ms_per_token = None
+
+        # Create document chain with specific prompt
+        document_prompt = PromptTemplate.from_template(
+            """
+            You are RAGAdmin, a technical assistant. Answer questions based on the provided document context.
+            
+            Context from documents:
+            {context}
+
+            Current chat history:
+            {chat_history}
+
+            Question: {input}
+
+            Instructions:
+            1. ONLY use information from the context above
+            2. Synthesize a complete and coherent answer from all relevant context
+            3. For character questions, include:
+               - Who they are
+               - Their key characteristics
+               - Important interactions or events
+            4. Use direct quotes when relevant
+            5. If multiple context pieces provide information, combine them logically
+            6. Do not make up or infer information not present in the context
+            
+            Answer:
             """
-Determine if this question requires accessing document/file context.
-Question: {query}
-
-Instructions:
-1. Respond with 'YES' if the question:
-   - Mentions ANY specific names, terms, or entities.
-   - References ANY file, document, or content (e.g., "in the file", "in the document").
-   - Asks about details or data that might exist in a file (PDF, text, etc.).
-   - Contains terms or phrases that suggest consulting or analyzing external content.
-   - Asks "who is", "what is", "explain", or similar questions about specific topics or entities.
-2. The response must be exactly 'YES' or 'NO' (case sensitive).
-3. If in doubt, respond with 'YES'.
-
-Analysis steps:
-1. Does the question mention or imply the need for file or document content? -> YES
-2. Does it ask about terms, data, or context that could exist in a document or file? -> YES
-3. Does it suggest consulting external information or specific content? -> YES
-4. Could this information reasonably exist in a file format (PDF, text, etc.)? -> YES
-5. Is there ANY uncertainty about whether accessing a document would help? -> YES
-
-For example:
-- "What is mentioned in the report?" -> YES (references a document or file).
-- "Explain the terms in this file" -> YES (asks about file content).
-- "How do I create a loop in Python?" -> NO (general programming question).
-- "What does the document say about budgets?" -> YES (references document content).
-- "Tell me about the data in the file" -> YES (references external content).
-- "Maths questions" -> NO (general math question).
-
-If the question does not require document context, respond with 'NO'.
-
-Final response (YES/NO):
-"""
+        )
 
+        # Create document chain
+        self.document_chain = create_stuff_documents_chain(
+            llm=self.llm,
+            prompt=document_prompt
         )
-        
-        response = self.llm.invoke(context_check_prompt.format(query=query))
-        print(f"\n=== Context Check Details ===")
-        print(f"Query: {query}")
-        print(f"Raw response: {response}")
-        print(f"Final decision: {response.strip().upper() == 'YES'}")
-        
-        return response.strip().upper() == 'YES'
 
-    def generate_response(self, query: str, chat_id: str, history: list = None):
-        try:
-            # Initialize or get chat history for this specific chat_id
-            if chat_id not in self.chat_histories:
-                self.chat_histories[chat_id] = []
+        self.direct_prompt = PromptTemplate.from_template(
+            """
+            You are RAGAdmin, a technical assistant powered by LLama. Here are your session details:
+            - Session ID: {chat_id}
+            - Current Date: {current_date}
             
-            # Format the history for this specific chat
-            formatted_history = ""
-            if history:
-                self.chat_histories[chat_id] = []  # Reset history for this chat
-                formatted_messages = []  # Initialize the list here
-                for msg in history:
-                    role = msg.get('role', '')
-                    content = msg.get('content', '')
-                    if role == 'human':
-                        self.chat_histories[chat_id].append({"role": "human", "content": content})
-                        formatted_messages.append(f"Human: {content}")
-                    elif role in ['assistant', 'ai']:  # Handle both 'assistant' and 'ai' roles
-                        self.chat_histories[chat_id].append({"role": "assistant", "content": content})
-                        formatted_messages.append(f"Assistant: {content}")
-                formatted_history = "\n".join(formatted_messages)
-
-            print(f"\n=== Chat History ===")
-            print(formatted_history)
+            Previous conversation:
+            {chat_history}
             
-            # Check if we need document context
-            needs_context = self.should_use_context(query)
-            print(f"\n=== Context Check ===")
-            print(f"Query: {query}")
-            print(f"Needs context: {needs_context}")
+            Question: {input}
             
+            Provide a clear and concise response based on your general knowledge.
+            """
+        )
+
+    def should_use_context(self, query: str) -> bool:
+        """Determine if the query needs document context."""
+        return self.context_router.route(query).use_context
+
+    def generate_response(self, query: str, chat_id: str, history: list = None, stream: bool = False,
+                          use_cache: bool = True):
+        """Answer a query.
+
+        With stream=True, return a generator of events as they are produced:
+        {"event": "token", "data": "<text chunk>"} for every LLM chunk, then a final
+        {"event": "done", "data": {"sources": [...], "used_context": bool}}.
+        Otherwise return the full answer string. use_cache=False skips the answer cache.
+        """
+        events = self._generate_events(query, chat_id, history, use_cache)
+        if stream:
+            return events
+
+        answer_parts = []
+        for event in events:
+            if event["event"] == "token":
+                answer_parts.append(event["data"])
+        return "".join(answer_parts)
+
+    def _generate_events(self, query: str, chat_id: str, history: list = None, use_cache: bool = True):
+        try:
+            with span('history'):
+                history_window = self.history_manager.window(chat_id, self._prepare_history(chat_id, history))
+            formatted_history = history_window.text
+
+            # Check if we need document context
+            with span('router'):
+                decision = self.context_router.route(query)
+            needs_context = decision.use_context
+
+            retrieval = self._retrieve_context(query) if needs_context else RetrievalResult()
+
+            embedding, hit = self._lookup_answer(query, retrieval, use_cache, history_window)
+            if hit is not None:
+                yield {"event": "token", "data": hit.answer}
+                yield self._finish(query, chat_id, hit.answer, decision, retrieval, hit, history=history_window)
+                return
+
+            with span('prompt_build'):
+                packed = self.context_packer.pack(retrieval.documents, retrieval.scores) if needs_context else None
+                chain, inputs = self._generation_chain(query, chat_id, formatted_history, needs_context,
+                                                       packed.documents if packed else [])
+
+            # Stream the answer chunks as Ollama produces them
+            answer_parts = []
+            ttft_ms = None
+            metrics = OllamaMetricsHandler()
+            generation_start = time.perf_counter()
+            for chunk in chain.stream(inputs, config={"callbacks": [metrics]}):
+                if not chunk:
+                    # Ollama's final part only carries the generation metrics
+                    continue
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - generation_start) * 1000
+                answer_parts.append(chunk)
+                yield {"event": "token", "data": chunk}
+            self._observe_generation(ttft_ms, generation_start)
+
+            answer = "".join(answer_parts)
+            self._store_answer(retrieval, embedding, answer)
+            yield self._finish(query, chat_id, answer, decision, retrieval,
+                               context=self._context_report(packed, inputs, ttft_ms, metrics.metrics), history=history_window)
+
+        except Exception as e:
+            chat_requests.inc(outcome='error')
+            logger.error(f"Error generating response in chat {chat_id}: {str(e)}")
+            raise
+
+    async def agenerate_response(self, query: str, chat_id: str, history: list = None, use_cache: bool = True):
+        """Async variant of generate_response(stream=True), yielding the same events."""
+        try:
+            # The session store is a database, keep it off the event loop
+            with span('history'):
+                messages = await sync_to_async(self._prepare_history)(chat_id, history)
+                history_window = await self.history_manager.awindow(chat_id, messages)
+            formatted_history = history_window.text
+
+            with span('router'):
+                decision = await self.context_router.aroute(query)
+            needs_context = decision.use_context
+
+            retrieval = RetrievalResult()
             if needs_context:
-                # Get documents from vector store
-                vector_store = self.vector_store_service.vector_store
-                
-                # Print vector store status
-                collection_size = len(vector_store.get()['ids'])
-                print(f"\n=== Vector Store Status ===")
-                print(f"Total documents in store: {collection_size}")
-                
-                # First get documents directly
-                results = vector_store.similarity_search(
-                    query,
-                    k=5,
-                    filter=None
-                )
-                
-                print(f"\n=== Retrieved Documents ===")
-                print(f"Number of documents found: {len(results)}")
-                for idx, doc in enumerate(results):
-                    print(f"\nDocument {idx + 1}:")
-                    print(f"Content preview: {doc.page_content[:200]}...")
-                    print(f"Metadata: {doc.metadata}")
-                
-                retriever = vector_store.as_retriever(
-                    search_type="similarity_score_threshold",
-                    search_kwargs={
-                        "k": 5,
-                        "score_threshold": 0.1,  # Lowered from 0.5 to 0.1
-                    }
-                )
-                
-                # Create document chain with specific prompt
-                document_prompt = PromptTemplate.from_template(
-                    """
-                    You are RAGAdmin, a technical assistant. Answer questions based on the provided document context.
-                    
-                    Context from documents:
-                    {context}
-
-                    Current chat history:
-                    {chat_history}
-
-                    Question: {input}
-
-                    Instructions:
-                    1. ONLY use information from the context above
-                    2. Synthesize a complete and coherent answer from all relevant context
-                    3. For character questions, include:
-                       - Who they are
-                       - Their key characteristics
-                       - Important interactions or events
-                    4. Use direct quotes when relevant
-                    5. If multiple context pieces provide information, combine them logically
-                    6. Do not make up or infer information not present in the context
-                    
-                    Answer:
-                    """
-                )
-
-                # Create document chain
-                document_chain = create_stuff_documents_chain(
-                    llm=self.llm,
-                    prompt=document_prompt
-                )
-
-                # Create retrieval chain
-                retrieval_chain = create_retrieval_chain(
-                    retriever=retriever,
-                    combine_docs_chain=document_chain
-                )
-
-                # Get response
-                response = retrieval_chain.invoke({
-                    "input": query,
-                    "chat_history": formatted_history,
-                    "chat_id": chat_id,
-                    "current_date": datetime.now(ZoneInfo("UTC")).strftime("%Y-%m-%d %H:%M:%S UTC")
-                })
-                
-                print(f"\n=== Final Response ===")
-                print(f"Answer: {response['answer']}")
-                if 'context' in response:
-                    print(f"\n=== Context Used ===")
-                    print(response['context'])
-                
-                answer = response["answer"]
-
-            else:
-                # Direct LLM response for non-document queries
-                direct_prompt = PromptTemplate.from_template(
-                    """
-                    You are RAGAdmin, a technical assistant powered by LLama. Here are your session details:
-                    - Session ID: {chat_id}
-                    - Current Date: {current_date}
-                    
-                    Previous conversation:
-                    {chat_history}
-                    
-                    Question: {input}
-                    
-                    Provide a clear and concise response based on your general knowledge.
-                    """
-                )
-                
-                answer = self.llm.invoke(direct_prompt.format(
-                    chat_id=chat_id,
-                    current_date=datetime.now(ZoneInfo("UTC")).strftime("%Y-%m-%d %H:%M:%S UTC"),
-                    chat_history=formatted_history,
-                    input=query
-                ))
-
-            # Update chat history
-            self.chat_histories[chat_id].append({"role": "human", "content": query})
-            self.chat_histories[chat_id].append({"role": "assistant", "content": answer})
-
-            return answer
+                # The vector store client is blocking, keep it off the event loop
+                retrieval = await sync_to_async(self._retrieve_context, thread_sensitive=False)(query)
+
+            embedding, hit = await sync_to_async(self._lookup_answer, thread_sensitive=False)(
+                query, retrieval, use_cache, history_window
+            )
+            if hit is not None:
+                yield {"event": "token", "data": hit.answer}
+                yield await sync_to_async(self._finish)(query, chat_id, hit.answer, decision, retrieval, hit,
+                                                        history=history_window)
+                return
+
+            with span('prompt_build'):
+                packed = self.context_packer.pack(retrieval.documents, retrieval.scores) if needs_context else None
+                chain, inputs = self._generation_chain(query, chat_id, formatted_history, needs_context,
+                                                       packed.documents if packed else [])
+
+            answer_parts = []
+            ttft_ms = None
+            metrics = OllamaMetricsHandler()
+            generation_start = time.perf_counter()
+            async for chunk in chain.astream(inputs, config={"callbacks": [metrics]}):
+                if not chunk:
+                    # Ollama's final part only carries the generation metrics
+                    continue
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - generation_start) * 1000
+                answer_parts.append(chunk)
+                yield {"event": "token", "data": chunk}
+            self._observe_generation(ttft_ms, generation_start)
+
+            answer = "".join(answer_parts)
+            self._store_answer(retrieval, embedding, answer)
+            yield await sync_to_async(self._finish)(query, chat_id, answer, decision, retrieval,
+                                                    context=self._context_report(packed, inputs, ttft_ms, metrics.metrics),
+                                                    history=history_window)
 
         except Exception as e:
-            print(f"\n=== Error ===")
-            print(f"Error generating response: {str(e)}")
+            chat_requests.inc(outcome='error')
             logger.error(f"Error generating response in chat {chat_id}: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    def _prepare_history(self, chat_id: str, history: list = None) -> list:
+        """Return the chat's messages: the stored ones, reconciled with a client history if given."""
+        if history is None:
+            return self.session_store.messages(chat_id)
+        chat_history = []
+        for msg in history:
+            role = msg.get('role', '')
+            content = msg.get('content', '')
+            if role == 'human':
+                chat_history.append({"role": "human", "content": content})
+            elif role in ['assistant', 'ai']:  # Handle both 'assistant' and 'ai' roles
+                chat_history.append({"role": "assistant", "content": content})
+        return self.session_store.resolve(chat_id, chat_history)
+
+    def _retrieve_context(self, query: str) -> RetrievalResult:
+        """Fetch the documents used as context for a query, in a single scored search."""
+        return self.vector_store_service.retrieve(query, k=5, score_threshold=0.1)
+
+    def _observe_generation(self, ttft_ms: float, generation_start: float) -> None:
+        if ttft_ms is not None:
+            llm_seconds.observe(ttft_ms / 1000, model=self.model_name, phase='first_token')
+        llm_seconds.observe(time.perf_counter() - generation_start, model=self.model_name, phase='total')
+
+    def _lookup_answer(self, query: str, retrieval: RetrievalResult, use_cache: bool, history=None):
+        """Look the query up in the answer cache. Return (query embedding, hit or None).
+
+        Only answers grounded in retrieved chunks are cached: the key is the
+        model, the exact set of chunk ids and the query embedding. Questions
+        asked with a history (turns or summary) are neither looked up nor
+        stored: a follow-up like "why?" depends on its conversation.
+        """
+        if self.answer_cache is None or not use_cache or not retrieval.ids:
+            return None, None
+        if history is not None and history.text.strip():
+            return None, None
+        # Already computed for routing and retrieval, served by the query embedding cache
+        embedding = self.vector_store_service.embed_query(query)
+        return embedding, self.answer_cache.lookup(self.model_name, retrieval.ids, embedding)
+
+    def _store_answer(self, retrieval: RetrievalResult, embedding, answer: str) -> None:
+        if embedding is None or not answer.strip():
+            return
+        chroma_ids = {doc.metadata.get('chroma_id') for doc in retrieval.documents}
+        self.answer_cache.store(self.model_name, retrieval.ids, chroma_ids - {None}, embedding, answer)
+
+    def _generation_chain(self, query: str, chat_id: str, formatted_history: str, needs_context: bool, context_documents: list):
+        """Return the runnable producing the answer and its input."""
+        inputs = {
+            "input": query,
+            "chat_history": formatted_history,
+            "chat_id": chat_id,
+            "current_date": datetime.now(ZoneInfo("UTC")).strftime("%Y-%m-%d %H:%M:%S UTC")
+        }
+        if needs_context:
+            inputs["context"] = context_documents
+            return self.document_chain, inputs
+
+        # Direct LLM response for non-document queries
+        return self.direct_prompt | self.llm, inputs
+
+    def _context_report(self, packed, inputs: dict, ttft_ms: float, generation: dict = None) -> dict:
+        """Packing counters, time to first token, Ollama load vs generation timings and
+        the prefill time the saved tokens are worth."""
+        report = packed.as_dict() if packed else {}
+        report["ttft_ms"] = ttft_ms
+        report["ollama"] = generation or {}
+        if generation:
+            ollama_metrics.record(self.model_name, generation)
+        prompt_tokens = estimate_tokens(inputs["input"] + inputs["chat_history"]) + (packed.tokens_out if packed else 0)
+        report["prompt_tokens"] = prompt_tokens
+        if generation and generation.get("prompt_tokens") and generation.get("prompt_eval_ms") is not None:
+            # Ollama's own prefill timing, without the model load
+            rate = generation["prompt_eval_ms"] / generation["prompt_tokens"]
+        elif ttft_ms is not None and prompt_tokens:
+            rate = ttft_ms / prompt_tokens
+        else:
+            rate = None
+        if rate is not None:
+            previous = self._prefill_ms_per_token
+            self._prefill_ms_per_token = rate if previous is None else 0.8 * previous + 0.2 * rate
+        if packed and self._prefill_ms_per_token is not None:
+            report["prefill_ms_saved"] = report["tokens_saved"] * self._prefill_ms_per_token
+        return report
+
+    def _finish(self, query: str, chat_id: str, answer: str, decision, retrieval: RetrievalResult, cache_hit=None,
+                context: dict = None, history=None) -> dict:
+        """Record the turn and build the final event carrying the sources."""
+        chat_requests.inc(outcome='cache_hit' if cache_hit else 'generated')
+        log_payload("Chat %s\nHistory: %s\nQuery: %s\nContext used: %s\nRetrieved: %s\nAnswer: %s",
+                    chat_id, history.text if history else '', query, decision.use_context,
+                    retrieval.documents, answer)
+
+        # Record the turn; the cursor lets the client send only its next message
+        cursor = self.session_store.append(chat_id, [
+            {"role": "human", "content": query},
+            {"role": "assistant", "content": answer}
+        ])
+
+        sources = [doc.metadata for doc in retrieval.documents]
+        return {"event": "done", "data": {
+            "sources": sources,
+            "cursor": cursor,
+            "used_context": decision.use_context,
+            "router": decision.as_dict(),
+            "retrieval": retrieval.metadata(),
+            "answer_cache": cache_hit.as_dict() if cache_hit else {"hit": False},
+            "context": context or {},
+            "history": history.as_dict() if history else {}
+        }}
@@ -0,0 +1,89 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any
+from django.conf import settings
+from .chat_service import ChatService
+from .session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+
+class ChatServicePool:
+    """Process-wide registry holding one warm ChatService per Ollama model."""
+
+    def __init__(self, vector_store_service, max_models: int = None, answer_cache=None, session_store=None):
+        self.vector_store_service = vector_store_service
+        self.answer_cache = answer_cache  # Shared by every model's service
+        self.session_store = session_store or SessionStore()  # One store, so every model sees the same chats
+        self.max_models = max_models or getattr(settings, 'CHAT_SERVICE_POOL_SIZE', 3)
+        self._services = OrderedDict()  # model_name -> ChatService, least recently used first
+        self._stats = {}  # model_name -> counters
+        self._lock = threading.Lock()
+        self._model_locks = {}  # model_name -> lock serialising the first load
+
+    def _model_stats(self, model_name: str) -> Dict[str, Any]:
+        if model_name not in self._stats:
+            self._stats[model_name] = {
+                'hits': 0,
+                'misses': 0,
+                'loads': 0,
+                'evictions': 0,
+                'last_load_seconds': None,
+                'total_load_seconds': 0.0,
+                'last_used': None,
+            }
+        return self._stats[model_name]
+
+    def get(self, model_name: str) -> ChatService:
+        """Return the pooled ChatService for a model, creating it on first use."""
+        with self._lock:
+            stats = self._model_stats(model_name)
+            stats['last_used'] = time.time()
+            service = self._services.get(model_name)
+            if service is not None:
+                self._services.move_to_end(model_name)
+                stats['hits'] += 1
+                return service
+            stats['misses'] += 1
+            model_lock = self._model_locks.setdefault(model_name, threading.Lock())
+
+        # Load outside the global lock so other models keep being served,
+        # but only let one request per model pay for the load.
+        with model_lock:
+            with self._lock:
+                service = self._services.get(model_name)
+                if service is not None:
+                    self._services.move_to_end(model_name)
+                    return service
+
+            start = time.perf_counter()
+            service = ChatService(self.vector_store_service, model_name=model_name, answer_cache=self.answer_cache,
+                                  session_store=self.session_store)
+            load_seconds = time.perf_counter() - start
+            logger.info(f"Loaded chat service for model {model_name} in {load_seconds:.2f}s")
+
+            with self._lock:
+                stats = self._model_stats(model_name)
+                stats['loads'] += 1
+                stats['last_load_seconds'] = load_seconds
+                stats['total_load_seconds'] += load_seconds
+                self._services[model_name] = service
+                self._evict_idle()
+            return service
+
+    def _evict_idle(self) -> None:
+        """Drop least recently used models beyond the pool size. Caller holds the lock."""
+        while len(self._services) > self.max_models:
+            model_name, _ = self._services.popitem(last=False)
+            self._stats[model_name]['evictions'] += 1
+            logger.info(f"Evicted idle chat service for model {model_name}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-model hit/miss and load-time counters."""
+        with self._lock:
+            return {
+                'max_models': self.max_models,
+                'loaded': list(self._services.keys()),
+                'models': {name: dict(counters) for name, counters in self._stats.items()},
+            }
@@ -0,0 +1,124 @@
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Tuple
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+# Separator between pages in the stored document text
+PAGE_SEPARATOR = "\n\n"
+
+@dataclass
+class Chunk:
+    """A chunk of the document text, located by character offsets and pages."""
+    text: str
+    start: int  # Offset in the pages joined with PAGE_SEPARATOR
+    end: int
+    page_start: int
+    page_end: int
+
+@dataclass
+class _Sentence:
+    text: str
+    separator: str  # Text between the previous sentence and this one
+    start: int
+    page: int
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.text)
+
+class SentenceChunker:
+    """Single-pass, sentence-aware chunker with overlap.
+
+    Sentences are accumulated until the next one would overflow chunk_size;
+    the chunk is then emitted and its trailing sentences (or the last words of
+    its last sentence), up to chunk_overlap characters, start the next one. Chunks can span pages. A sentence longer
+    than chunk_size is cut into overlapping windows. Each chunk is built with
+    a single join, so the cost is linear in the text size.
+    """
+
+    def __init__(self, chunk_size: int = 1024, chunk_overlap: int = 80):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def _sentences(self, pages: Iterable[Tuple[int, str]]) -> Iterator[_Sentence]:
+        offset = 0
+        separator = ""
+        for page_number, text in pages:
+            if not text:
+                continue
+            position = 0
+            for match in _SENTENCE_END.finditer(text):
+                yield _Sentence(text[position:match.start()], separator, offset + position, page_number)
+                separator = match.group()
+                position = match.end()
+            if position < len(text):
+                yield _Sentence(text[position:], separator, offset + position, page_number)
+            offset += len(text) + len(PAGE_SEPARATOR)
+            separator = PAGE_SEPARATOR
+
+    def _build(self, sentences: List[_Sentence]) -> Chunk:
+        parts = [sentences[0].text]
+        for sentence in sentences[1:]:
+            parts.append(sentence.separator)
+            parts.append(sentence.text)
+        return Chunk("".join(parts), sentences[0].start, sentences[-1].end,
+                     sentences[0].page, sentences[-1].page)
+
+    def _split_long(self, sentence: _Sentence) -> Iterator[Chunk]:
+        step = self.chunk_size - self.chunk_overlap
+        for position in range(0, len(sentence.text), step):
+            piece = sentence.text[position:position + self.chunk_size]
+            start = sentence.start + position
+            yield Chunk(piece, start, start + len(piece), sentence.page, sentence.page)
+            if position + self.chunk_size >= len(sentence.text):
+                break
+
+    def chunks(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Chunk]:
+        """Chunk (page_number, text) pages lazily, in document order."""
+        current: List[_Sentence] = []
+        length = 0
+        for sentence in self._sentences(pages):
+            if len(sentence.text) > self.chunk_size:
+                if current:
+                    yield self._build(current)
+                    current, length = [], 0
+                yield from self._split_long(sentence)
+                continue
+
+            added = len(sentence.text) + (len(sentence.separator) if current else 0)
+            if current and length + added > self.chunk_size:
+                yield self._build(current)
+                # Carry the trailing sentences that fit in the overlap
+                carried = []
+                carried_length = 0
+                for previous in reversed(current):
+                    cost = len(previous.text) + (len(carried[0].separator) if carried else 0)
+                    if carried_length + cost > self.chunk_overlap:
+                        break
+                    carried.insert(0, previous)
+                    carried_length += cost
+                if not carried:
+                    # No whole sentence fits, carry the last words of the last one
+                    last = current[-1]
+                    tail_start = len(last.text) - self.chunk_overlap
+                    space = last.text.find(' ', tail_start)
+                    if tail_start > 0 and space != -1:
+                        tail = last.text[space + 1:]
+                        carried = [_Sentence(tail, "", last.start + space + 1, last.page)]
+                        carried_length = len(tail)
+                current, length = carried, carried_length
+                added = len(sentence.text) + (len(sentence.separator) if current else 0)
+                # The overlap must not push the new sentence over the limit
+                while current and length + added > self.chunk_size:
+                    dropped = current.pop(0)
+                    length -= len(dropped.text) + (len(current[0].separator) if current else 0)
+                    added = len(sentence.text) + (len(sentence.separator) if current else 0)
+
+            current.append(sentence)
+            length += added
+
+        if current:
+            yield self._build(current)
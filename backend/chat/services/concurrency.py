@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+class QueueFull(Exception):
+    """Raised when a request cannot get an Ollama slot or a place in the queue."""
+
+    def __init__(self, queue_position: int):
+        super().__init__(f"Ollama queue is full (position {queue_position})")
+        self.queue_position = queue_position
+
+class OllamaTicket:
+    """A request's claim on an Ollama slot, either held or waiting in the queue."""
+
+    def __init__(self, limiter):
+        self._limiter = limiter
+        self._event = threading.Event()
+        self._future = None
+        self._released = False
+        self.position = limiter._enter(self)  # 0 when the slot is held straight away
+        if not self.position:
+            self._event.set()
+
+    def _wake(self) -> None:
+        self._event.set()
+        future = self._future
+        if future is not None:
+            future.get_loop().call_soon_threadsafe(_resolve, future)
+
+    def wait(self, timeout: float = None) -> None:
+        """Block the calling thread until the slot is ours."""
+        if not self._event.wait(timeout):
+            self.release()
+            raise QueueFull(self.position)
+
+    async def wait_async(self) -> None:
+        """Wait for the slot without holding a thread."""
+        self._future = asyncio.get_running_loop().create_future()
+        if self._event.is_set():
+            return
+        try:
+            await self._future
+        except asyncio.CancelledError:
+            self.release()
+            raise
+
+    def release(self) -> None:
+        """Give the slot back, or leave the queue if still waiting. Idempotent."""
+        if not self._released:
+            self._released = True
+            self._limiter._leave(self)
+
+class OllamaConcurrencyLimiter:
+    """FIFO semaphore capping concurrent generations against the Ollama host.
+
+    Shared by sync request threads and async views: a released slot is handed
+    directly to the oldest waiting ticket, whichever kind of request owns it.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters = deque()  # tickets waiting for a slot, oldest first
+
+    def enter(self) -> OllamaTicket:
+        """Take a slot or a place in the queue. Raise QueueFull when both are exhausted."""
+        return OllamaTicket(self)
+
+    def _enter(self, ticket) -> int:
+        with self._lock:
+            if self._active < self.max_concurrent and not self._waiters:
+                self._active += 1
+                return 0
+            if len(self._waiters) >= self.max_queue:
+                raise QueueFull(len(self._waiters) + 1)
+            self._waiters.append(ticket)
+            return len(self._waiters)
+
+    def _leave(self, ticket) -> None:
+        with self._lock:
+            if ticket in self._waiters:
+                self._waiters.remove(ticket)
+                return
+            if self._waiters:
+                next_ticket = self._waiters.popleft()
+            else:
+                self._active -= 1
+                return
+        next_ticket._wake()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'active': self._active,
+                'queued': len(self._waiters),
+            }
+
+def _resolve(future) -> None:
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,136 @@
+import logging
+import math
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+from langchain.schema import Document
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r'\w+')
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for Llama-family tokenizers)."""
+    return math.ceil(len(text) / 4)
+
+@dataclass
+class PackedContext:
+    documents: List[Document] = field(default_factory=list)
+    scores: List[float] = field(default_factory=list)
+    chunks_in: int = 0
+    merged: int = 0  # Chunks folded into a neighbour of the same document
+    duplicates: int = 0  # Near-duplicate passages dropped
+    dropped: int = 0  # Passages left out by the token budget
+    tokens_in: int = 0
+    tokens_out: int = 0
+    budget: int = 0
+    pack_ms: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "chunks_in": self.chunks_in,
+            "passages": len(self.documents),
+            "merged": self.merged,
+            "duplicates": self.duplicates,
+            "dropped": self.dropped,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "tokens_saved": self.tokens_in - self.tokens_out,
+            "budget": self.budget,
+            "pack_ms": self.pack_ms,
+        }
+
+class ContextPacker:
+    """Turn retrieved chunks into the passages pasted in the prompt.
+
+    Overlapping or adjacent chunks of the same document are merged using
+    their character offsets, passages whose word trigrams mostly repeat a
+    better one are dropped, and passages are kept best score first until the
+    token budget is reached.
+    """
+
+    def __init__(self, token_budget: int = 2048, duplicate_threshold: float = 0.85):
+        self.token_budget = token_budget
+        self.duplicate_threshold = duplicate_threshold
+
+    @staticmethod
+    def _merge(chunks: List[tuple]) -> List[tuple]:
+        """Merge (document, score) chunks of one document whose offsets touch or overlap."""
+        chunks = sorted(chunks, key=lambda item: item[0].metadata['start'])
+        merged = [chunks[0]]
+        for doc, score in chunks[1:]:
+            previous, previous_score = merged[-1]
+            previous_end = previous.metadata['end']
+            if doc.metadata['start'] > previous_end:
+                merged.append((doc, score))
+                continue
+            # Chunk text is the document text between its offsets, so the overlap is exact
+            text = previous.page_content + doc.page_content[previous_end - doc.metadata['start']:]
+            metadata = dict(previous.metadata)
+            metadata['end'] = max(previous_end, doc.metadata['end'])
+            metadata['page_end'] = max(previous.metadata.get('page_end', 0), doc.metadata.get('page_end', 0))
+            metadata['chunk_ids'] = previous.metadata.get('chunk_ids', [previous.metadata.get('chunk_id')]) + [doc.metadata.get('chunk_id')]
+            merged[-1] = (Document(page_content=text, metadata=metadata), max(score, previous_score))
+        return merged
+
+    @staticmethod
+    def _shingles(text: str) -> set:
+        words = _WORD.findall(text.lower())
+        return {tuple(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+
+    def _is_duplicate(self, shingles: set, kept: List[set]) -> bool:
+        for other in kept:
+            smaller = min(len(shingles), len(other))
+            if smaller and len(shingles & other) / smaller >= self.duplicate_threshold:
+                return True
+        return False
+
+    def pack(self, documents: List[Document], scores: List[float], token_budget: int = None) -> PackedContext:
+        start = time.perf_counter()
+        budget = token_budget or self.token_budget
+        packed = PackedContext(chunks_in=len(documents), budget=budget)
+        packed.tokens_in = sum(estimate_tokens(doc.page_content) for doc in documents)
+        if not scores:
+            scores = [0.0] * len(documents)
+
+        # Merge neighbours within each document; chunks without offsets stay as they are
+        by_document, passages = {}, []
+        for doc, score in zip(documents, scores):
+            if 'start' in doc.metadata and 'end' in doc.metadata and doc.metadata.get('chroma_id'):
+                by_document.setdefault(doc.metadata['chroma_id'], []).append((doc, score))
+            else:
+                passages.append((doc, score))
+        for chunks in by_document.values():
+            merged = self._merge(chunks)
+            packed.merged += len(chunks) - len(merged)
+            passages.extend(merged)
+
+        passages.sort(key=lambda item: item[1], reverse=True)
+        kept_shingles = []
+        used = 0
+        for doc, score in passages:
+            shingles = self._shingles(doc.page_content)
+            if self._is_duplicate(shingles, kept_shingles):
+                packed.duplicates += 1
+                continue
+            tokens = estimate_tokens(doc.page_content)
+            if used + tokens > budget:
+                if packed.documents:
+                    packed.dropped += 1
+                    continue
+                # Always keep the best passage, cut to the budget
+                doc = Document(page_content=doc.page_content[:budget * 4], metadata=doc.metadata)
+                tokens = estimate_tokens(doc.page_content)
+            kept_shingles.append(shingles)
+            packed.documents.append(doc)
+            packed.scores.append(score)
+            used += tokens
+
+        packed.tokens_out = used
+        packed.pack_ms = (time.perf_counter() - start) * 1000
+        logger.info(
+            f"Packed {packed.chunks_in} chunks into {len(packed.documents)} passages, "
+            f"{packed.tokens_out}/{budget} tokens ({packed.tokens_in - packed.tokens_out} saved)"
+        )
+        return packed
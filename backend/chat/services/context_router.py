@@ -0,0 +1,249 @@
+import logging
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, asdict
+from typing import Optional, Tuple
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from langchain.prompts import PromptTemplate
+from .lru_cache import LRUCache, normalize_query
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_CHECK_PROMPT = PromptTemplate.from_template(
+    """
+Determine if this question requires accessing document/file context.
+Question: {query}
+
+Instructions:
+1. Respond with 'YES' if the question:
+   - Mentions ANY specific names, terms, or entities.
+   - References ANY file, document, or content (e.g., "in the file", "in the document").
+   - Asks about details or data that might exist in a file (PDF, text, etc.).
+   - Contains terms or phrases that suggest consulting or analyzing external content.
+   - Asks "who is", "what is", "explain", or similar questions about specific topics or entities.
+2. The response must be exactly 'YES' or 'NO' (case sensitive).
+3. If in doubt, respond with 'YES'.
+
+Analysis steps:
+1. Does the question mention or imply the need for file or document content? -> YES
+2. Does it ask about terms, data, or context that could exist in a document or file? -> YES
+3. Does it suggest consulting external information or specific content? -> YES
+4. Could this information reasonably exist in a file format (PDF, text, etc.)? -> YES
+5. Is there ANY uncertainty about whether accessing a document would help? -> YES
+
+For example:
+- "What is mentioned in the report?" -> YES (references a document or file).
+- "Explain the terms in this file" -> YES (asks about file content).
+- "How do I create a loop in Python?" -> NO (general programming question).
+- "What does the document say about budgets?" -> YES (references document content).
+- "Tell me about the data in the file" -> YES (references external content).
+- "Maths questions" -> NO (general math question).
+
+If the question does not require document context, respond with 'NO'.
+
+Final response (YES/NO):
+"""
+)
+
+# Source of decisions taken because nothing is indexed; they are not cached,
+# so the query is routed again once documents are uploaded
+EMPTY_CORPUS = 'empty_corpus'
+
+# Questions the assistant answers from general knowledge
+GENERAL_PROTOTYPES = [
+    "How do I create a loop in Python?",
+    "What is 12 times 7?",
+    "Solve this equation for x",
+    "Hello, how are you?",
+    "Translate this sentence into English",
+    "Write a bash one-liner that lists files by size",
+    "Explain what recursion is",
+    "Bonjour, comment ça va ?",
+    "Combien font 15 fois 3 ?",
+    "Écris une fonction Python qui trie une liste",
+]
+
+# Questions that point at the uploaded documents
+DOCUMENT_PROTOTYPES = [
+    "What does the document say about this?",
+    "Summarize the uploaded file",
+    "According to the manual, how do I configure the server?",
+    "What is mentioned in the report?",
+    "Tell me about the data in the file",
+    "Que dit le document à ce sujet ?",
+    "Résume le fichier",
+    "Dans la procédure, quelle est l'étape suivante ?",
+]
+
+@dataclass
+class RouterDecision:
+    use_context: bool
+    confidence: float
+    source: str  # 'embedding', 'llm', 'cache' or 'empty_corpus'
+    latency_ms: float
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+class ContextRouter(ABC):
+    """Decide whether a query needs document context, caching decisions per normalized query."""
+
+    def __init__(self, cache_size: int = None):
+        self.cache = LRUCache(cache_size or getattr(settings, 'CHAT_ROUTER_CACHE_SIZE', 1024))
+
+    def _cache_key(self, query: str):
+        return normalize_query(query)
+
+    async def _acache_key(self, query: str):
+        return self._cache_key(query)
+
+    def route(self, query: str) -> RouterDecision:
+        start = time.perf_counter()
+        key = self._cache_key(query)
+        cached = self.cache.get(key)
+        if cached is None:
+            use_context, confidence, source = self._route(query)
+            if source != EMPTY_CORPUS:
+                self.cache.put(key, (use_context, confidence))
+        else:
+            (use_context, confidence), source = cached, 'cache'
+        return self._decision(use_context, confidence, source, start)
+
+    async def aroute(self, query: str) -> RouterDecision:
+        start = time.perf_counter()
+        key = await self._acache_key(query)
+        cached = self.cache.get(key)
+        if cached is None:
+            use_context, confidence, source = await self._aroute(query)
+            if source != EMPTY_CORPUS:
+                self.cache.put(key, (use_context, confidence))
+        else:
+            (use_context, confidence), source = cached, 'cache'
+        return self._decision(use_context, confidence, source, start)
+
+    def _decision(self, use_context, confidence, source, start) -> RouterDecision:
+        decision = RouterDecision(use_context, confidence, source, (time.perf_counter() - start) * 1000)
+        logger.info(
+            f"Router decision: use_context={decision.use_context} source={decision.source} "
+            f"confidence={decision.confidence:.3f} in {decision.latency_ms:.1f}ms"
+        )
+        return decision
+
+    @abstractmethod
+    def _route(self, query: str) -> Tuple[bool, float, str]:
+        """Return (use context, confidence, source) for an uncached query."""
+
+    async def _aroute(self, query: str) -> Tuple[bool, float, str]:
+        return await sync_to_async(self._route, thread_sensitive=False)(query)
+
+class LLMContextRouter(ContextRouter):
+    """Ask the chat model itself for a YES/NO answer (one extra generation per query)."""
+
+    def __init__(self, llm, cache_size: int = None):
+        super().__init__(cache_size)
+        self.llm = llm
+
+    def _route(self, query: str) -> Tuple[bool, float, str]:
+        response = self.llm.invoke(CONTEXT_CHECK_PROMPT.format(query=query))
+        return self._parse(response), 1.0, 'llm'
+
+    async def _aroute(self, query: str) -> Tuple[bool, float, str]:
+        response = await self.llm.ainvoke(CONTEXT_CHECK_PROMPT.format(query=query))
+        return self._parse(response), 1.0, 'llm'
+
+    def _parse(self, response: str) -> bool:
+        logger.debug(f"LLM router raw response: {response}")
+        return response.strip().upper() == 'YES'
+
+class EmbeddingContextRouter(ContextRouter):
+    """Route locally from the query embedding.
+
+    The query is compared with "general question" and "document question"
+    prototypes and with its nearest chunk in the corpus. The margin between
+    the best document-side and general-side similarity is the confidence;
+    below the threshold the decision is delegated to the fallback router.
+    """
+
+    def __init__(self, vector_store_service, fallback: ContextRouter = None,
+                 confidence_threshold: float = None, cache_size: int = None):
+        super().__init__(cache_size)
+        self.vector_store_service = vector_store_service
+        self.fallback = fallback
+        self.confidence_threshold = (
+            confidence_threshold if confidence_threshold is not None
+            else getattr(settings, 'CHAT_ROUTER_CONFIDENCE', 0.05)
+        )
+        embeddings = vector_store_service.embeddings
+        self._general = self._normalize(np.array(embeddings.embed_documents(GENERAL_PROTOTYPES)))
+        self._document = self._normalize(np.array(embeddings.embed_documents(DOCUMENT_PROTOTYPES)))
+
+    def _cache_key(self, query: str):
+        # Decisions depend on the nearest chunk, so they expire when the collection changes
+        return normalize_query(query), self.vector_store_service.generation
+
+    async def _acache_key(self, query: str):
+        # The generation is read from the database, keep it off the event loop
+        return await sync_to_async(self._cache_key, thread_sensitive=False)(query)
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def _score(self, query: str) -> Optional[Tuple[bool, float]]:
+        """(use context, margin), or None when nothing is indexed."""
+        vector_store = self.vector_store_service.vector_store
+        embedding = self.vector_store_service.embed_query(query)
+        q = self._normalize(np.array(embedding))
+
+        general_sim = float(np.max(self._general @ q))
+        document_sim = float(np.max(self._document @ q))
+
+        # Nearest chunk in the corpus, reusing the query embedding. Its similarity is the
+        # cosine with the stored chunk embedding, on the same scale as the prototypes
+        # (Chroma's relevance scores are derived from L2 distances)
+        nearest = vector_store._collection.query(query_embeddings=[embedding], n_results=1, include=["embeddings"])
+        if not nearest["ids"] or not nearest["ids"][0]:
+            return None
+        corpus_sim = float(self._normalize(np.array(nearest["embeddings"][0][0])) @ q)
+
+        margin = max(document_sim, corpus_sim) - general_sim
+        logger.debug(
+            f"Embedding router: general={general_sim:.3f} document={document_sim:.3f} "
+            f"corpus={corpus_sim:.3f} margin={margin:.3f}"
+        )
+        return margin > 0, abs(margin)
+
+    def _route(self, query: str) -> Tuple[bool, float, str]:
+        scored = self._score(query)
+        if scored is None:
+            # Nothing indexed, retrieval could not help
+            return False, 1.0, EMPTY_CORPUS
+        use_context, confidence = scored
+        if confidence < self.confidence_threshold:
+            if self.fallback is None:
+                return True, confidence, 'embedding'  # If in doubt, use the documents
+            use_context, _, source = self.fallback._route(query)
+            return use_context, confidence, source
+        return use_context, confidence, 'embedding'
+
+    async def _aroute(self, query: str) -> Tuple[bool, float, str]:
+        scored = await sync_to_async(self._score, thread_sensitive=False)(query)
+        if scored is None:
+            return False, 1.0, EMPTY_CORPUS
+        use_context, confidence = scored
+        if confidence < self.confidence_threshold:
+            if self.fallback is None:
+                return True, confidence, 'embedding'
+            use_context, _, source = await self.fallback._aroute(query)
+            return use_context, confidence, source
+        return use_context, confidence, 'embedding'
+
+def build_context_router(vector_store_service, llm) -> ContextRouter:
+    """Create the router selected by settings.CHAT_CONTEXT_ROUTER ('embedding' or 'llm')."""
+    llm_router = LLMContextRouter(llm)
+    if getattr(settings, 'CHAT_CONTEXT_ROUTER', 'embedding') == 'llm':
+        return llm_router
+    return EmbeddingContextRouter(vector_store_service, fallback=llm_router)
@@ -0,0 +1,138 @@
+import base64
+import json
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from django.db.models import Q
+from django.db.models.functions import Length, Substr
+from django.utils.dateparse import parse_datetime
+from ..models import Document
+from .chunker import PAGE_SEPARATOR
+
+logger = logging.getLogger(__name__)
+
+# Columns of the document list; the content is never selected there
+LIST_FIELDS = ('id', 'name', 'file_type', 'upload_date')
+SORTS = ('upload_date', '-upload_date', 'name', '-name')
+
+class InvalidRequest(ValueError):
+    """A malformed cursor, sort or range in a document list or content request."""
+
+def encode_cursor(value, document_id: int) -> str:
+    """Opaque position after a row: its sort value and id."""
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    raw = json.dumps([value, document_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str, field: str) -> Tuple[Any, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, document_id = json.loads(raw)
+        if field == 'upload_date':
+            value = parse_datetime(value)
+        if value is None or not isinstance(document_id, int):
+            raise ValueError(cursor)
+        return value, document_id
+    except (ValueError, TypeError) as e:
+        raise InvalidRequest(f"Invalid cursor: {cursor}") from e
+
+def list_documents(limit: int, sort: str = '-upload_date', cursor: Optional[str] = None,
+                   file_types: Optional[List[str]] = None, name: Optional[str] = None
+                   ) -> Tuple[List[Document], Optional[str]]:
+    """One page of documents, keyset-paginated on (sort field, id), and the cursor of the next page.
+
+    The seek condition uses the (field, id) indexes, so a page costs the same
+    however deep it is, and rows inserted meanwhile don't shift the pages.
+    """
+    if sort not in SORTS:
+        raise InvalidRequest(f"Invalid sort: {sort}")
+    descending = sort.startswith('-')
+    field = sort.lstrip('-')
+    documents = Document.objects.only(*LIST_FIELDS)
+    if file_types:
+        documents = documents.filter(file_type__in=file_types)
+    if name:
+        documents = documents.filter(name__icontains=name)
+    if cursor:
+        value, document_id = decode_cursor(cursor, field)
+        op = 'lt' if descending else 'gt'
+        documents = documents.filter(
+            Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'id__{op}': document_id})
+        )
+    order = (f'-{field}', '-id') if descending else (field, 'id')
+    rows = list(documents.order_by(*order)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.id)
+    return rows, next_cursor
+
+def page_spans(page_offsets: Optional[list], total_length: int) -> List[Tuple[int, int, int]]:
+    """(page number, start, end) of each page of the stored content.
+
+    Documents ingested before offsets were recorded read as a single page.
+    """
+    offsets = page_offsets or [[1, 0]]
+    spans = []
+    for i, (page_number, start) in enumerate(offsets):
+        end = offsets[i + 1][1] - len(PAGE_SEPARATOR) if i + 1 < len(offsets) else total_length
+        spans.append((page_number, start, max(start, end)))
+    return spans
+
+def document_info(document_id) -> Optional[Dict[str, Any]]:
+    """Name, type, content length and page offsets of a document, without reading its content."""
+    return (Document.objects.filter(id=document_id)
+            .annotate(total_length=Length('content'))
+            .values('name', 'file_type', 'page_offsets', 'total_length')
+            .first())
+
+def read_slice(document_id, start: int, length: int) -> str:
+    """Characters [start, start + length) of a document's content, cut by the database."""
+    if length <= 0:
+        return ''
+    return (Document.objects.filter(id=document_id)
+            .annotate(chunk=Substr('content', start + 1, length))
+            .values_list('chunk', flat=True)
+            .first()) or ''
+
+def resolve_range(info: Dict[str, Any], start: Optional[int] = None, length: Optional[int] = None,
+                  page: Optional[int] = None) -> Dict[str, Any]:
+    """Turn start/length or page parameters into a [start, end) character range of the content.
+
+    A page range covers that page's text; length, if given, caps it and the
+    rest of the page is read from next_start.
+    """
+    total = info['total_length'] or 0
+    spans = page_spans(info['page_offsets'], total)
+    if page is not None:
+        span = next((span for span in spans if span[0] == page), None)
+        if span is None:
+            raise InvalidRequest(f"No page {page}")
+        range_start = span[1] if start is None else max(span[1], min(start, span[2]))
+        range_end = span[2]
+    else:
+        range_start = min(max(start or 0, 0), total)
+        range_end = total
+    if length is not None:
+        if length < 0:
+            raise InvalidRequest(f"Invalid length: {length}")
+        range_end = min(range_end, range_start + length)
+    return {
+        'start': range_start,
+        'end': range_end,
+        'total_length': total,
+        'page': page,
+        'pages': [span[0] for span in spans],
+        'next_start': range_end if range_end < total else None,
+    }
+
+def stream_slices(document_id, start: int, end: int, block_chars: int) -> Iterator[str]:
+    """Read [start, end) from the database in blocks, for streamed responses."""
+    position = start
+    while position < end:
+        text = read_slice(document_id, position, min(block_chars, end - position))
+        if not text:
+            return
+        yield text
+        position += len(text)
@@ -1,143 +1,126 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
 import logging
 import os
 import tempfile
-from PyPDF2 import PdfReader
-from langchain_community.document_loaders import (
-    PyPDFLoader,
-    TextLoader,
-    UnstructuredMarkdownLoader,
-    PDFPlumberLoader
-)
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
 from langchain.schema import Document
+from .chunker import SentenceChunker, PAGE_SEPARATOR
+from .embedding_cache import content_hash
+from .extraction_engine import ExtractionEngine, normalize_text, pdf_page_count
 from ..models import Document as DBDocument
 import time
 import gc
+import hashlib
+import uuid
 
 logger = logging.getLogger(__name__)
 
+# Text files are read and yielded in blocks of this many characters
+TEXT_BLOCK_SIZE = 64 * 1024
+
 class DocumentService:
-    def __init__(self):
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1024,
-            chunk_overlap=80,
-            length_function=len,
-            is_separator_regex=False
-        )
+    def __init__(self, extraction_engine: ExtractionEngine = None):
+        self.extraction_engine = extraction_engine or ExtractionEngine()
+        self.chunker = SentenceChunker(chunk_size=1024, chunk_overlap=80)
+
+    def spool_upload(self, file) -> Tuple[str, str]:
+        """Copy an uploaded file to a unique temporary path. Return the path and the file's sha256."""
+        # Créer un répertoire temporaire si nécessaire
+        temp_dir = os.path.join(os.getcwd(), 'temp')
+        os.makedirs(temp_dir, exist_ok=True)
+        
+        # Utiliser un nom de fichier unique
+        temp_path = os.path.join(temp_dir, f"temp_{uuid.uuid4().hex}_{os.path.basename(file.name)}")
+        
+        # Écrire le fichier temporaire, en calculant son empreinte au passage
+        digest = hashlib.sha256()
+        with open(temp_path, 'wb') as destination:
+            for chunk in file.chunks():
+                digest.update(chunk)
+                destination.write(chunk)
+        return temp_path, digest.hexdigest()
 
     def process_file(self, file, file_type: str) -> str:
-        """Process different file types and split into chunks."""
+        """Extract the normalised text of an uploaded file, pages separated by blank lines."""
         temp_path = None
         try:
-            # Créer un répertoire temporaire si nécessaire
-            temp_dir = os.path.join(os.getcwd(), 'temp')
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            # Utiliser un nom de fichier unique
-            temp_path = os.path.join(temp_dir, f"temp_{file.name}")
-            
-            # Écrire le fichier temporaire
-            with open(temp_path, 'wb') as destination:
-                for chunk in file.chunks():
-                    destination.write(chunk)
-            
-            # Extraire le texte selon le type de fichier
-            if file_type == 'pdf':
-                loader = PDFPlumberLoader(temp_path)
-                docs = loader.load_and_split()
-                text = '\n'.join([doc.page_content for doc in docs])
-            elif file_type in ['txt', 'md']:
-                with open(temp_path, 'r', encoding='utf-8') as text_file:
-                    text = text_file.read()
-            
-            # Normaliser les espaces
-            text = ' '.join(text.split())
-            
-            # Découper en phrases
-            sentences = text.replace('? ', '?<split>').replace('! ', '!<split>').replace('. ', '.<split>').split('<split>')
-            
-            # Créer des chunks de taille maximale
-            chunks = []
-            current_chunk = ""
-            
-            for sentence in sentences:
-                if len(current_chunk) + len(sentence) + 1 < 1000:
-                    current_chunk += (sentence + " ").strip()
-                else:
-                    chunks.append(current_chunk)
-                    current_chunk = sentence + " "
-            
-            if current_chunk:
-                chunks.append(current_chunk)
-            
-            # Joindre les chunks avec des séparateurs
-            return "\n\n".join(chunks)
+            temp_path, _ = self.spool_upload(file)
+            return PAGE_SEPARATOR.join(text for _, text in self.iter_pages(temp_path, file_type))
 
-        except Exception as e:
-            logger.error(f"Error processing file: {str(e)}")
-            raise
-        
         finally:
             if temp_path and os.path.exists(temp_path):
                 try:
                     os.remove(temp_path)
                 except:
                     pass
-            gc.collect()
+
+    def page_count(self, path: str, file_type: str) -> int:
+        """Number of pages iter_pages will yield for a PDF, 0 when unknown up front."""
+        if file_type != 'pdf':
+            return 0
+        return pdf_page_count(path)
+
+    def iter_pages(self, path: str, file_type: str) -> Iterator[Tuple[int, str]]:
+        """Yield (page_number, normalised_text) one page at a time.
+
+        Only a bounded window of pages is held in memory. Text files count as a
+        single page, read in TEXT_BLOCK_SIZE blocks cut on whitespace.
+        """
+        try:
+            if file_type == 'pdf':
+                # Page ranges are extracted in parallel by the process pool, in order
+                yield from self.extraction_engine.iter_pdf_pages(path)
+
+            elif file_type in ['txt', 'md']:
+                with open(path, 'r', encoding='utf-8') as text_file:
+                    carry = ''
+                    while True:
+                        block = text_file.read(TEXT_BLOCK_SIZE)
+                        if not block:
+                            break
+                        block = carry + block
+                        # Keep a possibly cut word for the next block
+                        cut = max(block.rfind(' '), block.rfind('\n'))
+                        if cut <= 0:
+                            carry = block
+                            continue
+                        carry = block[cut:]
+                        text = normalize_text(block[:cut])
+                        if text:
+                            yield 1, text
+                    text = normalize_text(carry)
+                    if text:
+                        yield 1, text
+
+            else:
+                raise ValueError(f"Unsupported file type: {file_type}")
+
+        except Exception as e:
+            logger.error(f"Error processing file: {str(e)}")
+            raise
+
+    def split_pages(self, pages: Iterable[Tuple[int, str]], metadata: dict) -> Iterator[Document]:
+        """Lazily chunk page texts into Langchain documents.
+
+        Each chunk's metadata carries its page range and character offsets in
+        the document text (pages joined with PAGE_SEPARATOR).
+        """
+        for chunk_id, chunk in enumerate(self.chunker.chunks(pages)):
+            doc_metadata = metadata.copy()
+            doc_metadata['chunk_id'] = chunk_id
+            doc_metadata['page'] = chunk.page_start
+            doc_metadata['page_end'] = chunk.page_end
+            doc_metadata['start'] = chunk.start
+            doc_metadata['end'] = chunk.end
+            doc_metadata['content_hash'] = content_hash(chunk.text)
+            yield Document(page_content=chunk.text, metadata=doc_metadata)
 
     def store_document(self, content: str, metadata: dict) -> List[Document]:
         """Split content and prepare documents for vector store."""
         try:
-            # Découper le contenu en chunks
-            texts = self.text_splitter.split_text(content)
-            logger.info(f"Split document into {len(texts)} chunks")
-            
-            # Créer les documents Langchain
-            documents = []
-            for i, text in enumerate(texts):
-                doc_metadata = metadata.copy()
-                doc_metadata['chunk_id'] = i
-                documents.append(
-                    Document(
-                        page_content=text,
-                        metadata=doc_metadata
-                    )
-                )
-            
-            logger.info(f"Created {len(documents)} Langchain documents")
-            # Log le premier document pour vérification
-            if documents:
-                logger.info(f"Sample document content: {documents[0].page_content[:100]}...")
-            
+            documents = list(self.split_pages([(1, content)], metadata))
+            logger.info(f"Split document into {len(documents)} chunks")
             return documents
             
         except Exception as e:
             logger.error(f"Error preparing documents: {str(e)}")
             raise
-
-    def _chunk_content(self, content, chunk_size=1000, overlap=100):
-        """Divise le contenu en chunks avec chevauchement."""
-        chunks = []
-        start = 0
-        content_length = len(content)
-        
-        while start < content_length:
-            end = start + chunk_size
-            if end > content_length:
-                end = content_length
-            
-            # Trouver la fin de la dernière phrase complète
-            while end < content_length and content[end] not in ['.', '!', '?', '\n']:
-                end += 1
-            if end < content_length:
-                end += 1
-            
-            chunk = content[start:end].strip()
-            if chunk:
-                chunks.append(chunk)
-            
-            start = end - overlap
-            
-        return chunks
\ No newline at end of file
@@ -0,0 +1,52 @@
+import logging
+from django.conf import settings
+from langchain_core.embeddings import Embeddings
+from .embedding_cache import EmbeddingCache, CachedEmbeddings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKENDS = ('fastembed', 'sentence-transformers')
+
+def build_base_embeddings(backend: str = None, model_name: str = None, batch_size: int = None,
+                          threads: int = None) -> Embeddings:
+    """Instantiate the embedding model of settings.EMBEDDING_BACKEND (arguments override the settings).
+
+    'fastembed' runs ONNX models on CPU with ONNX Runtime; its default
+    BAAI/bge-small-en-v1.5 is the int8-quantized export. 'sentence-transformers'
+    runs the PyTorch model. threads caps the intra-op threads of either runtime.
+    """
+    backend = backend or getattr(settings, 'EMBEDDING_BACKEND', 'fastembed')
+    model_name = model_name or getattr(settings, 'EMBEDDING_MODEL', 'BAAI/bge-small-en-v1.5')
+    batch_size = batch_size or getattr(settings, 'EMBEDDING_BATCH_SIZE', 64)
+    threads = threads or getattr(settings, 'EMBEDDING_THREADS', None)
+    try:
+        if backend == 'fastembed':
+            from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
+            embeddings = FastEmbedEmbeddings(model_name=model_name, batch_size=batch_size, threads=threads)
+        elif backend == 'sentence-transformers':
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+            if threads:
+                import torch
+                torch.set_num_threads(threads)
+            embeddings = HuggingFaceEmbeddings(
+                model_name=model_name,
+                encode_kwargs={'batch_size': batch_size, 'normalize_embeddings': True}
+            )
+        else:
+            raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {EMBEDDING_BACKENDS}")
+    except Exception as e:
+        logger.error(f"Error loading {backend} embedding model {model_name}: {str(e)}")
+        raise
+    logger.info(f"Loaded {backend} embedding model {model_name} (batch size {batch_size}, threads {threads or 'default'})")
+    return embeddings
+
+def build_embeddings(backend: str = None, model_name: str = None, **kwargs) -> CachedEmbeddings:
+    """The configured embedding model behind the on-disk embedding cache."""
+    backend = backend or getattr(settings, 'EMBEDDING_BACKEND', 'fastembed')
+    model_name = model_name or getattr(settings, 'EMBEDDING_MODEL', 'BAAI/bge-small-en-v1.5')
+    return CachedEmbeddings(
+        build_base_embeddings(backend, model_name, **kwargs),
+        EmbeddingCache(settings.EMBEDDING_CACHE_PATH),
+        model_id=f"{backend}:{model_name}",
+        cache_queries=getattr(settings, 'QUERY_EMBEDDING_CACHE_ON_DISK', False)
+    )
@@ -0,0 +1,118 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+from array import array
+from typing import Dict, Iterable, List, Tuple
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class EmbeddingCache:
+    """On-disk SQLite store of embeddings keyed by content hash and embedding model id."""
+
+    # SQLite limits the number of parameters in one statement
+    _LOOKUP_BATCH = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def key(model_id: str, text: str) -> str:
+        return content_hash(f"{model_id}\0{text}")
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), self._LOOKUP_BATCH):
+                batch = keys[i:i + self._LOOKUP_BATCH]
+                rows = self._connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                )
+                for key, blob in rows:
+                    vector = array('f')
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, List[float]]]) -> None:
+        rows = [(key, array('f', vector).tobytes()) for key, vector in items]
+        with self._lock:
+            self._connection.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+            self._connection.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only computes vectors for chunks it has never seen."""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_id: str,
+                 cache_queries: bool = False):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_id = model_id
+        # Query embeddings differ from passage embeddings, so they get their own keys
+        self.cache_queries = cache_queries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents_with_stats(self, texts: List[str]) -> Tuple[List[List[float]], int, int]:
+        """Embed texts through the cache. Return (vectors, cache hits, cache misses)."""
+        keys = [self.cache.key(self.model_id, text) for text in texts]
+        vectors = self.cache.get_many(set(keys))
+
+        # Embed each unseen text once, even if it appears several times
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+        if missing:
+            computed = self.embeddings.embed_documents(list(missing.values()))
+            new_vectors = dict(zip(missing.keys(), computed))
+            self.cache.put_many(new_vectors.items())
+            vectors.update(new_vectors)
+
+        hits = len(texts) - len(missing)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(missing)
+        return [vectors[key] for key in keys], hits, len(missing)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents_with_stats(texts)[0]
+
+    def embed_query(self, text: str) -> List[float]:
+        if not self.cache_queries:
+            return self.embeddings.embed_query(text)
+        key = self.cache.key(f"{self.model_id}:query", text)
+        vector = self.cache.get_many([key]).get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put_many([(key, vector)])
+        return vector
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'model_id': self.model_id,
+                'entries': self.cache.count(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
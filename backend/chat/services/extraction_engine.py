@@ -0,0 +1,95 @@
+import logging
+import multiprocessing
+import re
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Tuple
+import pdfplumber
+
+# Keep this module free of Django and Langchain imports: worker processes import it.
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize_text(text: str) -> str:
+    """Collapse every run of whitespace to a single space."""
+    return _WHITESPACE.sub(' ', text).strip()
+
+def pdf_page_count(path: str) -> int:
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+def extract_pdf_pages(path: str, first: int = 1, last: int = None) -> Iterator[Tuple[int, str]]:
+    """Yield (page_number, normalised_text) for pages first..last (1-based, inclusive)."""
+    pages = list(range(first, last + 1)) if last else None
+    with pdfplumber.open(path, pages=pages) as pdf:
+        for page in pdf.pages:
+            text = normalize_text(page.extract_text() or '')
+            page_number = page.page_number
+            page.close()  # Drop the page's parsed layout before the next one
+            if text:
+                yield page_number, text
+
+def _extract_pdf_range(path: str, first: int, last: int) -> List[Tuple[int, str]]:
+    """Process pool task: extract one page range."""
+    return list(extract_pdf_pages(path, first, last))
+
+class ExtractionEngine:
+    """Spread PDF page ranges over a process pool and hand pages back in order.
+
+    The pool is shared by every ingestion job, so several files being ingested
+    at once also spread across the workers.
+    """
+
+    def __init__(self, max_workers: int = None, pages_per_task: int = None):
+        from django.conf import settings
+        self.max_workers = max_workers or getattr(settings, 'EXTRACTION_WORKERS', 1)
+        self.pages_per_task = pages_per_task or getattr(settings, 'EXTRACTION_PAGES_PER_TASK', 8)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Spawn rather than fork: the web process has threads and open connections
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def iter_pdf_pages(self, path: str, page_count: int = None) -> Iterator[Tuple[int, str]]:
+        """Yield (page_number, text) in page order, extracting ranges in parallel.
+
+        At most two ranges per worker are in flight, so memory stays bounded on
+        long documents.
+        """
+        if page_count is None:
+            page_count = pdf_page_count(path)
+        if self.max_workers <= 1 or page_count <= self.pages_per_task:
+            yield from extract_pdf_pages(path)
+            return
+
+        pool = self._pool()
+        ranges = deque(
+            (first, min(first + self.pages_per_task - 1, page_count))
+            for first in range(1, page_count + 1, self.pages_per_task)
+        )
+        in_flight = deque()
+        try:
+            while ranges or in_flight:
+                while ranges and len(in_flight) < self.max_workers * 2:
+                    first, last = ranges.popleft()
+                    in_flight.append(pool.submit(_extract_pdf_range, path, first, last))
+                yield from in_flight.popleft().result()
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,183 @@
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Tuple
+from asgiref.sync import sync_to_async
+from langchain.prompts import PromptTemplate
+from .context_packer import estimate_tokens
+from .embedding_cache import content_hash
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = PromptTemplate.from_template(
+    """
+Summary of the conversation so far:
+{summary}
+
+New lines of the conversation:
+{lines}
+
+Write an updated summary of the whole conversation in at most {max_words} words.
+Keep names, identifiers, figures and decisions; drop greetings and repetitions.
+Write it in the language of the conversation. Reply with the summary only.
+
+Updated summary:"""
+)
+
+@dataclass
+class _Summary:
+    text: str
+    summarized: int  # Number of leading messages folded into the text
+    prefix_hash: str  # Hash of those messages, to notice a rewritten history
+
+@dataclass
+class HistoryWindow:
+    """The history as it goes in the prompt: a rolling summary plus the latest messages."""
+    text: str
+    messages: int
+    summarized: int
+    folded_now: int = 0
+    summary_calls: int = 0
+    summary_ms: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "messages": self.messages,
+            "summarized": self.summarized,
+            "verbatim": self.messages - self.summarized,
+            "folded_now": self.folded_now,
+            "summary_calls": self.summary_calls,
+            "tokens": estimate_tokens(self.text),
+            "summary_ms": self.summary_ms,
+        }
+
+def _line(message: dict) -> str:
+    speaker = "Human" if message.get('role') == 'human' else "Assistant"
+    return f"{speaker}: {message.get('content', '')}"
+
+def _prefix_hash(messages: List[dict]) -> str:
+    return content_hash("\0".join(f"{m.get('role')}:{m.get('content', '')}" for m in messages))
+
+class HistoryManager:
+    """Keep the prompt history under a token budget, however long the chat.
+
+    The last keep_turns turns stay verbatim. Once twice that many are
+    unsummarized, the older ones are folded into a rolling summary, so a
+    summary update happens every keep_turns turns rather than on every
+    message. Messages are folded in batches of at most batch_tokens, one LLM
+    call each, so a long backlog never overflows the model's context.
+    Summaries are kept with the chat in the session store, shared by every
+    model and across restarts, and only extended with the messages that are
+    new since the last fold.
+    """
+
+    def __init__(self, llm, session_store, keep_turns: int = 4, token_budget: int = 1024,
+                 summary_tokens: int = 256, batch_tokens: int = 2048):
+        self.llm = llm
+        self.session_store = session_store
+        self.keep_messages = keep_turns * 2  # A turn is a question and its answer
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.batch_tokens = batch_tokens
+
+    def _load(self, chat_id: str, messages: List[dict]) -> _Summary:
+        text, summarized, prefix_hash = self.session_store.summary(chat_id)
+        if summarized and summarized <= len(messages) and prefix_hash == _prefix_hash(messages[:summarized]):
+            return _Summary(text, summarized, prefix_hash)
+        return _Summary("", 0, _prefix_hash([]))
+
+    def _cut(self, messages: List[dict], summary: _Summary) -> int:
+        """Index of the first message kept verbatim."""
+        cut = summary.summarized
+        if len(messages) - cut > 2 * self.keep_messages:
+            cut = len(messages) - self.keep_messages
+        # Fold more turns while the verbatim part does not fit next to a full-size summary
+        verbatim_budget = self.token_budget - self.summary_tokens
+        while len(messages) - cut > 2 and \
+                sum(estimate_tokens(_line(m)) + 1 for m in messages[cut:]) > verbatim_budget:
+            cut += 2
+        return cut
+
+    def _batches(self, pending: List[dict]) -> Iterator[Tuple[List[str], int]]:
+        """Split the messages to fold into (lines, message count) batches of at most batch_tokens."""
+        max_chars = self.batch_tokens * 4
+        lines, tokens = [], 0
+        for message in pending:
+            # A single oversized message is cut to one batch
+            line = _line(message)[:max_chars]
+            line_tokens = estimate_tokens(line) + 1
+            if lines and tokens + line_tokens > self.batch_tokens:
+                yield lines, len(lines)
+                lines, tokens = [], 0
+            lines.append(line)
+            tokens += line_tokens
+        if lines:
+            yield lines, len(lines)
+
+    def _summary_inputs(self, summary: _Summary, lines: List[str]) -> dict:
+        return {
+            "summary": summary.text or "(none)",
+            "lines": "\n".join(lines),
+            "max_words": int(self.summary_tokens * 0.75),
+        }
+
+    def _store(self, chat_id: str, messages: List[dict], cut: int, text: str) -> _Summary:
+        # Hard cap in case the model ignores the length instruction
+        summary = _Summary(text.strip()[:self.summary_tokens * 4], cut, _prefix_hash(messages[:cut]))
+        self.session_store.save_summary(chat_id, summary.text, summary.summarized, summary.prefix_hash)
+        return summary
+
+    def _render(self, summary: _Summary, messages: List[dict], folded: int, calls: int,
+                summary_ms: float) -> HistoryWindow:
+        recent = "\n".join(_line(m) for m in messages[summary.summarized:])
+        parts = []
+        if summary.text:
+            parts.append(f"Summary of earlier conversation: {summary.text}")
+        if recent:
+            # A single oversized message still has to fit: keep its most recent part
+            max_chars = max(0, self.token_budget * 4 - sum(len(part) for part in parts))
+            parts.append(recent[-max_chars:] if len(recent) > max_chars else recent)
+        return HistoryWindow("\n".join(parts), len(messages), summary.summarized, folded, calls, summary_ms)
+
+    def window(self, chat_id: str, messages: List[dict]) -> HistoryWindow:
+        """Build the prompt history, folding older messages into the summary if needed."""
+        summary = self._load(chat_id, messages)
+        cut = self._cut(messages, summary)
+        pending = messages[summary.summarized:cut]
+        summary_ms, calls = 0.0, 0
+        if pending:
+            start = time.perf_counter()
+            try:
+                # Each batch is saved as it is folded, an interrupted fold resumes from there
+                for lines, count in self._batches(pending):
+                    text = self.llm.invoke(SUMMARY_PROMPT.format(**self._summary_inputs(summary, lines)))
+                    summary = self._store(chat_id, messages, summary.summarized + count, text)
+                    calls += 1
+            except Exception as e:
+                logger.error(f"Error summarizing history of chat {chat_id}: {str(e)}")
+                raise
+            summary_ms = (time.perf_counter() - start) * 1000
+            logger.info(f"Folded {len(pending)} messages of chat {chat_id} into its summary "
+                        f"in {calls} calls, {summary_ms:.0f}ms")
+        return self._render(summary, messages, len(pending), calls, summary_ms)
+
+    async def awindow(self, chat_id: str, messages: List[dict]) -> HistoryWindow:
+        """Async variant of window()."""
+        summary = await sync_to_async(self._load)(chat_id, messages)
+        cut = self._cut(messages, summary)
+        pending = messages[summary.summarized:cut]
+        summary_ms, calls = 0.0, 0
+        if pending:
+            start = time.perf_counter()
+            try:
+                for lines, count in self._batches(pending):
+                    text = await self.llm.ainvoke(SUMMARY_PROMPT.format(**self._summary_inputs(summary, lines)))
+                    summary = await sync_to_async(self._store)(chat_id, messages, summary.summarized + count, text)
+                    calls += 1
+            except Exception as e:
+                logger.error(f"Error summarizing history of chat {chat_id}: {str(e)}")
+                raise
+            summary_ms = (time.perf_counter() - start) * 1000
+            logger.info(f"Folded {len(pending)} messages of chat {chat_id} into its summary "
+                        f"in {calls} calls, {summary_ms:.0f}ms")
+        return self._render(summary, messages, len(pending), calls, summary_ms)
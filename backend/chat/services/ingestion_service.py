@@ -0,0 +1,210 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+from django.conf import settings
+from django.db import close_old_connections
+from ..models import Document as DBDocument
+from .chunker import PAGE_SEPARATOR
+from .metrics import observe_ms, span
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class IngestionJob:
+    """Progress of one uploaded file through extraction, chunking and embedding.
+
+    Chunks are produced while pages are read, so chunks_total grows until the
+    last page is done.
+    """
+    document_id: int
+    chroma_id: str
+    filename: str
+    content_hash: Optional[str] = None  # sha256 of the upload, recorded on the document once indexed
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    stage: str = 'queued'  # queued, indexing, done, failed
+    pages_done: int = 0
+    pages_total: int = 0  # 0 when unknown up front (text files)
+    chunks_done: int = 0
+    chunks_total: int = 0
+    chunks_skipped: int = 0  # Duplicate chunks within the document
+    cache_hits: int = 0  # Chunks whose embedding came from the embedding cache
+    cache_misses: int = 0
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    embedding_started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        throughput = None
+        if self.embedding_started_at and self.chunks_done:
+            elapsed = (self.finished_at or time.time()) - self.embedding_started_at
+            throughput = self.chunks_done / elapsed if elapsed > 0 else None
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'job_id': self.id,
+            'document_id': self.document_id,
+            'chroma_id': self.chroma_id,
+            'filename': self.filename,
+            'stage': self.stage,
+            'pages_done': self.pages_done,
+            'pages_total': self.pages_total,
+            'chunks_done': self.chunks_done,
+            'chunks_total': self.chunks_total,
+            'chunks_skipped': self.chunks_skipped,
+            'chunks_per_second': throughput,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cache_hit_rate': self.cache_hits / lookups if lookups else None,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+class IngestionService:
+    """Run the upload pipeline on a local worker pool and track job progress."""
+
+    def __init__(self, document_service, vector_store_service, max_workers: int = None,
+                 batch_size: int = None, max_jobs: int = None):
+        self.document_service = document_service
+        self.vector_store_service = vector_store_service
+        self.batch_size = batch_size or getattr(settings, 'INGEST_EMBED_BATCH_SIZE', 256)
+        self.max_jobs = max_jobs or getattr(settings, 'INGEST_JOB_HISTORY', 200)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or getattr(settings, 'INGEST_WORKERS', 2),
+            thread_name_prefix='ingest'
+        )
+        self._jobs = OrderedDict()  # job id -> IngestionJob, oldest first
+        self._lock = threading.Lock()
+
+    def submit(self, document, spool_path: str, file_type: str, content_hash: str = None) -> IngestionJob:
+        """Queue a spooled upload for ingestion into an existing Document row."""
+        job = IngestionJob(document_id=document.id, chroma_id=document.chroma_id, filename=document.name,
+                           content_hash=content_hash)
+        with self._lock:
+            self._jobs[job.id] = job
+            # Forget the oldest finished jobs beyond the history size
+            for job_id in list(self._jobs):
+                if len(self._jobs) <= self.max_jobs:
+                    break
+                if self._jobs[job_id].stage in ('done', 'failed'):
+                    del self._jobs[job_id]
+        self._executor.submit(self._run, job, spool_path, file_type)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_job(self, content_hash: str) -> Optional[IngestionJob]:
+        """The queued or running job of an upload with this hash, if any."""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.content_hash == content_hash and job.stage in ('queued', 'indexing'):
+                    return job
+        return None
+
+    def _add_batch(self, job: IngestionJob, batch: list, spent: dict) -> None:
+        start = time.perf_counter()
+        counts = self.vector_store_service.add_documents(batch, persist=False)
+        job.chunks_done += len(batch)
+        job.cache_hits += counts['cache_hits']
+        job.cache_misses += counts['cache_misses']
+        spent['add'] += time.perf_counter() - start
+
+    def _run(self, job: IngestionJob, spool_path: str, file_type: str) -> None:
+        job.started_at = time.time()
+        run_start = time.perf_counter()
+        try:
+            job.stage = 'indexing'
+            job.pages_total = self.document_service.page_count(spool_path, file_type)
+            page_texts = []
+            page_offsets = []  # [page number, offset of its text in the stored content]
+            offset = 0
+            # Extraction, chunking and embedding interleave; their times are summed per document
+            spent = {'extract': 0.0, 'add': 0.0}
+
+            def pages():
+                nonlocal offset
+                page_iter = iter(self.document_service.iter_pages(spool_path, file_type))
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        page_number, text = next(page_iter)
+                    except StopIteration:
+                        return
+                    finally:
+                        spent['extract'] += time.perf_counter() - start
+                    if not page_offsets or page_offsets[-1][0] != page_number:
+                        page_offsets.append([page_number, offset])
+                    offset += len(text) + len(PAGE_SEPARATOR)
+                    page_texts.append(text)
+                    job.pages_done += 1
+                    yield page_number, text
+
+            # Pages stream through the splitter straight into embedding batches, so only
+            # one page and one batch of chunks are alive besides the document text itself
+            job.embedding_started_at = time.time()
+            pipeline_start = time.perf_counter()
+            batch = []
+            documents = self.document_service.split_pages(
+                pages(),
+                {"filename": job.filename, "id": str(job.document_id), "chroma_id": job.chroma_id}
+            )
+            seen_hashes = set()
+            for document in documents:
+                # Repeated boilerplate inside one document is indexed once
+                if document.metadata['content_hash'] in seen_hashes:
+                    job.chunks_skipped += 1
+                    continue
+                seen_hashes.add(document.metadata['content_hash'])
+                batch.append(document)
+                job.chunks_total += 1
+                if len(batch) >= self.batch_size:
+                    self._add_batch(job, batch, spent)
+                    batch = []
+            if batch:
+                self._add_batch(job, batch, spent)
+            observe_ms('ingest_extract', spent['extract'] * 1000)
+            observe_ms('ingest_chunk', (time.perf_counter() - pipeline_start - spent['extract'] - spent['add']) * 1000)
+            # A single persist for the whole document
+            with span('ingest_persist'):
+                self.vector_store_service.persist()
+
+            # The hash is only recorded once the document is fully indexed, so uploads are
+            # never deduplicated against a document a crash or restart left half-done
+            DBDocument.objects.filter(id=job.document_id).update(
+                content=PAGE_SEPARATOR.join(page_texts), page_offsets=page_offsets,
+                content_hash=job.content_hash
+            )
+
+            job.stage = 'done'
+            observe_ms('ingest_total', (time.perf_counter() - run_start) * 1000)
+            logger.info(f"Ingested {job.filename}: {job.pages_done} pages, {job.chunks_total} chunks")
+
+        except Exception as e:
+            job.stage = 'failed'
+            job.error = str(e)
+            logger.error(f"Error ingesting {job.filename}: {str(e)}")
+            # Do not leave a half-indexed document behind
+            try:
+                self.vector_store_service.delete_document(job.chroma_id)
+                DBDocument.objects.filter(id=job.document_id).delete()
+            except Exception as cleanup_error:
+                logger.error(f"Error cleaning up failed ingestion: {str(cleanup_error)}")
+
+        finally:
+            job.finished_at = time.time()
+            if os.path.exists(spool_path):
+                try:
+                    os.remove(spool_path)
+                except OSError:
+                    pass
+            close_old_connections()
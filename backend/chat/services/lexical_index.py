@@ -0,0 +1,84 @@
+import json
+import logging
+import re
+from typing import Dict, List, Tuple
+from django.db import connection, transaction
+from langchain.schema import Document
+from ..models import DocumentChunk
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r'\w+')
+# Hostnames, error codes, config keys, paths: words joined by punctuation
+_IDENTIFIER = re.compile(r'\w+(?:[-_.:/@]\w+)+')
+
+def fts_query(query: str) -> str:
+    """Build an FTS5 MATCH expression: any query word, with identifiers also matched as phrases.
+
+    BM25 sums the phrases that match, so chunks containing an identifier
+    verbatim rank above chunks that merely share its parts.
+    """
+    terms = []
+    for identifier in _IDENTIFIER.findall(query):
+        terms.append('"' + " ".join(_WORD.findall(identifier)) + '"')
+    for word in _WORD.findall(query.lower()):
+        term = f'"{word}"'
+        if term not in terms:
+            terms.append(term)
+    return " OR ".join(terms)
+
+class LexicalIndex:
+    """BM25 search over chunk text with SQLite FTS5, in the Django database.
+
+    Rows live in DocumentChunk; triggers mirror them into the
+    chat_documentchunk_fts index, and deleting a Document cascades to its chunks.
+    """
+
+    def add(self, documents: List[Document], ids: List[str]) -> int:
+        """Index chunks under their Chroma ids. Chunks without a Document row id are skipped."""
+        chunks = [
+            DocumentChunk(document_id=int(doc.metadata['id']), chunk_id=chunk_id,
+                          content=doc.page_content, metadata=doc.metadata)
+            for doc, chunk_id in zip(documents, ids)
+            if str(doc.metadata.get('id', '')).isdigit()
+        ]
+        with transaction.atomic():
+            DocumentChunk.objects.bulk_create(chunks, ignore_conflicts=True)
+        return len(chunks)
+
+    def delete(self, chroma_ids: List[str]) -> int:
+        deleted, _ = DocumentChunk.objects.filter(document__chroma_id__in=chroma_ids).delete()
+        return deleted
+
+    def count(self) -> int:
+        return DocumentChunk.objects.count()
+
+    def search(self, query: str, k: int = 5, min_score: float = 0.0) -> List[Tuple[str, Document, float]]:
+        """Return up to k (chunk id, document, score) best BM25 matches scoring at least min_score, best first.
+
+        Scores are negated bm25 values, so higher is better.
+        """
+        match = fts_query(query)
+        if not match:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.chunk_id, c.content, c.metadata, bm25(chat_documentchunk_fts) AS rank "
+                "FROM chat_documentchunk_fts JOIN chat_documentchunk c ON c.id = chat_documentchunk_fts.rowid "
+                "WHERE chat_documentchunk_fts MATCH %s ORDER BY rank LIMIT %s",
+                [match, k]
+            )
+            rows = cursor.fetchall()
+        return [
+            (chunk_id, Document(page_content=content, metadata=json.loads(metadata)), -rank)
+            for chunk_id, content, metadata, rank in rows
+            if -rank >= min_score
+        ]
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> Dict[str, float]:
+    """Fuse ranked id lists: each id scores the sum of 1 / (k + rank) over the lists it appears in."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return scores
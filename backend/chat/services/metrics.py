@@ -0,0 +1,148 @@
+import bisect
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Tuple
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+# Request/response payloads (history, retrieved chunks, answers), see log_payload()
+payload_logger = logging.getLogger('chat.payloads')
+
+# Seconds, from cache hits to slow generations
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+INF_LABEL = 'le="+Inf"'
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination, rendered in Prometheus text format."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in series_items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, INF_LABEL)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Process-wide metrics, created on first use and rendered together for /api/metrics/."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help_text: str, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labelnames, **kwargs)
+            return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get(Counter, name, help_text, labelnames)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+metrics = MetricsRegistry()
+
+# Chat stages: history, router, query_embedding, vector_search, lexical_search, retrieval,
+# prompt_build. Ingestion stages, per document: ingest_extract, ingest_chunk, ingest_persist,
+# ingest_total; per embedding batch: ingest_embed, ingest_index
+stage_seconds = metrics.histogram('ragadmin_stage_seconds', "Duration of a request or ingestion stage.", ['stage'])
+llm_seconds = metrics.histogram('ragadmin_llm_seconds', "LLM time to first token and total generation time.",
+                                ['model', 'phase'])
+chat_requests = metrics.counter('ragadmin_chat_requests_total', "Answered chats by outcome.", ['outcome'])
+
+def span(stage: str):
+    """Time a block into the ragadmin_stage_seconds histogram."""
+    return stage_seconds.time(stage=stage)
+
+def observe_ms(stage: str, milliseconds: float) -> None:
+    """Record a stage timed elsewhere (e.g. RetrievalResult timings)."""
+    stage_seconds.observe(milliseconds / 1000, stage=stage)
+
+def log_payload(message: str, *args) -> None:
+    """Log a request payload at DEBUG, only when DEBUG_PAYLOAD_LOGGING is on and for a sample of calls.
+
+    Payloads (histories, retrieved chunks, answers) are large; the message is
+    only formatted for sampled calls, so call it once per request.
+    """
+    if not getattr(settings, 'DEBUG_PAYLOAD_LOGGING', False):
+        return
+    if random.random() >= getattr(settings, 'DEBUG_PAYLOAD_SAMPLE_RATE', 0.01):
+        return
+    payload_logger.debug(message, *args)
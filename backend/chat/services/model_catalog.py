@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from .ollama_client import ollama_client
+
+logger = logging.getLogger(__name__)
+
+def describe_model(model) -> Dict[str, Any]:
+    """The catalog entry of one model of Ollama's /api/tags listing."""
+    details = model.details
+    return {
+        "name": model.model,
+        "size": int(model.size) if model.size is not None else None,
+        "modified_at": model.modified_at.isoformat() if model.modified_at else None,
+        "digest": model.digest,
+        "family": details.family if details else None,
+        "parameter_size": details.parameter_size if details else None,
+        "quantization": details.quantization_level if details else None,
+        "format": details.format if details else None,
+    }
+
+class ModelCatalog:
+    """Ollama's installed models, cached with stale-while-revalidate.
+
+    A listing younger than ttl is served as is. An older one is still served
+    straight away while a single background thread refreshes it, up to
+    max_stale seconds; beyond that (or on the first call) the request waits
+    for Ollama. If a refresh fails, the last good listing keeps being served.
+    """
+
+    def __init__(self, ttl: float = 30, max_stale: float = 600):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._models: Optional[List[Dict[str, Any]]] = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()  # Guards the cached listing and the refresh flag
+        self._fetch_lock = threading.Lock()  # One Ollama request at a time
+        self._refreshing = False
+        self._hits = 0
+        self._stale_hits = 0
+        self._fetches = 0
+        self._errors = 0
+        self._last_error = None
+        self._fetch_ms = 0.0
+
+    def _fetch(self) -> List[Dict[str, Any]]:
+        with self._fetch_lock:
+            start = time.perf_counter()
+            try:
+                models = [describe_model(model) for model in ollama_client().list().models]
+            except Exception as e:
+                with self._lock:
+                    self._errors += 1
+                    self._last_error = str(e)
+                logger.error(f"Error listing Ollama models: {str(e)}")
+                raise
+            fetch_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._models = models
+                self._fetched_at = time.monotonic()
+                self._fetches += 1
+                self._fetch_ms = fetch_ms
+                self._last_error = None
+            return models
+
+    def _refresh_in_background(self) -> None:
+        def run():
+            try:
+                self._fetch()
+            except Exception:
+                pass  # Already logged; the stale listing stays in place
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name='model-catalog-refresh', daemon=True).start()
+
+    def models(self, refresh: bool = False) -> List[Dict[str, Any]]:
+        """Return the catalog, fetching it from Ollama only when it is missing or too old."""
+        with self._lock:
+            models = self._models
+            age = time.monotonic() - self._fetched_at
+            if models is not None and not refresh:
+                if age < self.ttl:
+                    self._hits += 1
+                    return models
+                if age < self.ttl + self.max_stale:
+                    self._stale_hits += 1
+                    if not self._refreshing:
+                        self._refreshing = True
+                        self._refresh_in_background()
+                    return models
+        try:
+            return self._fetch()
+        except Exception:
+            if models is None:
+                raise
+            return models  # Ollama is unreachable: better an old listing than none
+
+    def names(self, refresh: bool = False) -> List[str]:
+        return [model["name"] for model in self.models(refresh)]
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._fetched_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "models": len(self._models) if self._models is not None else None,
+                "age_s": round(time.monotonic() - self._fetched_at, 1) if self._models is not None else None,
+                "ttl": self.ttl,
+                "max_stale": self.max_stale,
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "fetches": self._fetches,
+                "errors": self._errors,
+                "last_error": self._last_error,
+                "fetch_ms": self._fetch_ms,
+            }
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Union
+import httpx
+import ollama
+from django.conf import settings
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncClient
+
+def _client_options() -> Dict[str, Any]:
+    pool_size = getattr(settings, 'OLLAMA_HTTP_POOL_SIZE', 8)
+    return {
+        'host': getattr(settings, 'OLLAMA_HOST', None),
+        'timeout': getattr(settings, 'OLLAMA_TIMEOUT', 300),
+        'limits': httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+    }
+
+def ollama_client() -> ollama.Client:
+    """Process-wide Ollama client; its HTTP connections are pooled and kept alive."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ollama.Client(**_client_options())
+        return _client
+
+def ollama_async_client() -> ollama.AsyncClient:
+    """Async Ollama client shared by everything running on the current event loop."""
+    loop = asyncio.get_running_loop()
+    with _client_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = ollama.AsyncClient(**_client_options())
+            _async_clients[loop] = client
+        return client
+
+def keep_alive_for(model: str) -> Union[str, int, None]:
+    """How long Ollama keeps a model loaded after a request (settings.OLLAMA_KEEP_ALIVE, per model overrides)."""
+    per_model = getattr(settings, 'OLLAMA_KEEP_ALIVE_PER_MODEL', {})
+    return per_model.get(model, getattr(settings, 'OLLAMA_KEEP_ALIVE', None))
+
+def generation_metrics(response) -> Dict[str, Any]:
+    """Timings of a finished generation, in milliseconds (Ollama reports nanoseconds)."""
+    def ms(key):
+        value = response.get(key)
+        return value / 1e6 if value is not None else None
+    return {
+        'load_ms': ms('load_duration'),
+        'prompt_eval_ms': ms('prompt_eval_duration'),
+        'eval_ms': ms('eval_duration'),
+        'total_ms': ms('total_duration'),
+        'prompt_tokens': response.get('prompt_eval_count'),
+        'eval_tokens': response.get('eval_count'),
+    }
+
+class OllamaMetrics:
+    """Per-model running totals of load vs generation time."""
+
+    # A load longer than this means the model was not in memory
+    COLD_LOAD_MS = 500
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, metrics: Dict[str, Any]) -> None:
+        with self._lock:
+            stats = self._models.setdefault(model, {
+                'requests': 0, 'cold_starts': 0, 'load_ms': 0.0, 'prompt_eval_ms': 0.0, 'eval_ms': 0.0,
+                'prompt_tokens': 0, 'eval_tokens': 0,
+            })
+            stats['requests'] += 1
+            if (metrics.get('load_ms') or 0) > self.COLD_LOAD_MS:
+                stats['cold_starts'] += 1
+            for key in ('load_ms', 'prompt_eval_ms', 'eval_ms', 'prompt_tokens', 'eval_tokens'):
+                stats[key] += metrics.get(key) or 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {model: dict(stats) for model, stats in self._models.items()}
+
+ollama_metrics = OllamaMetrics()
+
+class OllamaMetricsHandler(BaseCallbackHandler):
+    """Collects the Ollama timings of the LLM calls of one chain run."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                if generation.generation_info and 'load_ms' in generation.generation_info:
+                    self.metrics = {key: generation.generation_info[key] for key in
+                                    ('load_ms', 'prompt_eval_ms', 'eval_ms', 'total_ms', 'prompt_tokens', 'eval_tokens')}
+
+class PooledOllama(LLM):
+    """Langchain LLM for Ollama's generate API over the shared, pooled clients."""
+
+    model: str
+    keep_alive: Optional[Union[str, int]] = None
+    options: Dict[str, Any] = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "ollama-pooled"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model, "keep_alive": self.keep_alive, "options": self.options}
+
+    def _request(self, prompt: str, stop: Optional[List[str]]) -> Dict[str, Any]:
+        options = dict(self.options)
+        if stop:
+            options['stop'] = stop
+        return {"model": self.model, "prompt": prompt, "stream": True, "options": options,
+                "keep_alive": self.keep_alive}
+
+    @staticmethod
+    def _chunk(part) -> GenerationChunk:
+        info = None
+        if part.get('done'):
+            info = generation_metrics(part)
+            info['done_reason'] = part.get('done_reason')
+        return GenerationChunk(text=part.get('response') or '', generation_info=info)
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> Iterator[GenerationChunk]:
+        for part in ollama_client().generate(**self._request(prompt, stop)):
+            chunk = self._chunk(part)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs) -> AsyncIterator[GenerationChunk]:
+        async for part in await ollama_async_client().generate(**self._request(prompt, stop)):
+            chunk = self._chunk(part)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        return "".join(chunk.text for chunk in self._stream(prompt, stop, run_manager))
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        return "".join([chunk.text async for chunk in self._astream(prompt, stop, run_manager)])
+
+def preload(model: str) -> Dict[str, Any]:
+    """Load a model into Ollama's memory (an empty generate request) and return its timings."""
+    try:
+        response = ollama_client().generate(model=model, prompt="", keep_alive=keep_alive_for(model))
+        metrics = generation_metrics(response)
+        logger.info(f"Preloaded Ollama model {model} in {metrics['load_ms'] or 0:.0f}ms")
+        return metrics
+    except Exception as e:
+        logger.error(f"Error preloading Ollama model {model}: {str(e)}")
+        raise
+
+def preload_in_background(models: Iterable[str]) -> threading.Thread:
+    """Warm models one after the other on a daemon thread; failures are only logged."""
+    def run():
+        for model in models:
+            try:
+                preload(model)
+            except Exception:
+                pass
+
+    thread = threading.Thread(target=run, name='ollama-preload', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_UNSET = object()
+
+class LazyService:
+    """A process-wide service, built on first use and only once, whichever thread asks first.
+
+    The factory imports its module itself, so the heavy dependencies
+    (embedding models, Chroma, langchain, PDF parsers) are only loaded by the
+    processes that actually serve requests.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self._factory = factory
+        self._instance = _UNSET
+        self._lock = threading.Lock()
+        self.build_seconds = None
+
+    def __call__(self):
+        instance = self._instance
+        if instance is not _UNSET:
+            return instance
+        with self._lock:
+            if self._instance is _UNSET:
+                start = time.perf_counter()
+                try:
+                    self._instance = self._factory()
+                except Exception as e:
+                    logger.error(f"Error initializing {self.name}: {str(e)}")
+                    raise
+                self.build_seconds = time.perf_counter() - start
+                logger.info(f"Initialized {self.name} in {self.build_seconds:.2f}s")
+            return self._instance
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not _UNSET
+
+def _embeddings():
+    from .embedding_backend import build_embeddings
+    return build_embeddings()
+
+def _vector_store_service():
+    from .vector_store_service import VectorStoreService
+    return VectorStoreService(embeddings())
+
+def _document_service():
+    from .document_service import DocumentService
+    return DocumentService()
+
+def _answer_cache():
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None
+    from .answer_cache import AnswerCache
+    return AnswerCache(settings.ANSWER_CACHE_SIZE, settings.ANSWER_CACHE_TTL, settings.ANSWER_CACHE_SIMILARITY)
+
+def _session_store():
+    from .session_store import SessionStore
+    return SessionStore(
+        settings.CHAT_SESSION_CACHE_SIZE,
+        settings.CHAT_SESSION_IDLE_SECONDS,
+        settings.CHAT_SESSION_SWEEP_SECONDS
+    )
+
+def _chat_service_pool():
+    from .chat_service_pool import ChatServicePool
+    return ChatServicePool(vector_store_service(), answer_cache=answer_cache(), session_store=session_store())
+
+def _ingestion_service():
+    from .ingestion_service import IngestionService
+    return IngestionService(document_service(), vector_store_service())
+
+def _ollama_limiter():
+    from .concurrency import OllamaConcurrencyLimiter
+    return OllamaConcurrencyLimiter(settings.OLLAMA_MAX_CONCURRENCY, settings.OLLAMA_MAX_QUEUE)
+
+def _model_catalog():
+    from .model_catalog import ModelCatalog
+    return ModelCatalog(settings.MODEL_CATALOG_TTL, settings.MODEL_CATALOG_MAX_STALE)
+
+embeddings = LazyService('embeddings', _embeddings)
+vector_store_service = LazyService('vector store', _vector_store_service)
+document_service = LazyService('document service', _document_service)
+answer_cache = LazyService('answer cache', _answer_cache)
+session_store = LazyService('session store', _session_store)
+chat_service_pool = LazyService('chat service pool', _chat_service_pool)
+ingestion_service = LazyService('ingestion service', _ingestion_service)
+ollama_limiter = LazyService('Ollama limiter', _ollama_limiter)
+model_catalog = LazyService('model catalog', _model_catalog)
+
+SERVICES = [
+    embeddings, vector_store_service, document_service, answer_cache, session_store,
+    chat_service_pool, ingestion_service, ollama_limiter, model_catalog,
+]
+
+def warmup(models=None, preload_ollama: bool = True) -> Dict[str, float]:
+    """Build every service, then the chat services of `models` (default OLLAMA_PRELOAD_MODELS).
+
+    With preload_ollama the models are also loaded into Ollama. Return the
+    seconds spent per step; failures of individual steps are logged and skipped.
+    """
+    models = list(settings.OLLAMA_PRELOAD_MODELS if models is None else models)
+    timings = {}
+
+    def step(name, fn):
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception:
+            return  # Already logged by the service
+        timings[name] = round(time.perf_counter() - start, 3)
+
+    for service in SERVICES:
+        step(service.name, service)
+    for model in models:
+        step(f"chat service {model}", lambda: chat_service_pool().get(model))
+        if preload_ollama:
+            from .ollama_client import preload
+            step(f"Ollama {model}", lambda: preload(model))
+    return timings
+
+def warmup_in_background(**kwargs) -> threading.Thread:
+    thread = threading.Thread(target=warmup, kwargs=kwargs, name='service-warmup', daemon=True)
+    thread.start()
+    return thread
+
+def service_stats() -> Dict[str, Any]:
+    """Which services are built, and how long each took."""
+    return {service.name: service.build_seconds if service.loaded else None for service in SERVICES}
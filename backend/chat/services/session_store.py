@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Tuple
+from django.db import transaction
+from django.utils import timezone
+from ..models import ChatSession, ChatTurn
+from .lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+class SessionConflict(Exception):
+    """The client's cursor does not match the stored chat; it must resend the full history."""
+
+    def __init__(self, cursor: int):
+        super().__init__(f"Chat has {cursor} stored messages")
+        self.cursor = cursor
+
+class SessionStore:
+    """Chat histories kept server-side, keyed by chat id.
+
+    Messages are append-only ChatTurn rows in the Django database; the most
+    recently used chats are also held in an in-memory LRU, so memory stays
+    bounded however many chats exist. Each chat's rolling history summary
+    is stored on its session. Chats idle for longer than idle_seconds are
+    deleted.
+    """
+
+    def __init__(self, cache_size: int = 256, idle_seconds: float = 7 * 24 * 3600,
+                 sweep_interval: float = 3600):
+        self.idle_seconds = idle_seconds
+        self.sweep_interval = sweep_interval
+        self._cache = LRUCache(cache_size)  # chat_id -> tuple of messages
+        self._summaries = LRUCache(cache_size)  # chat_id -> (summary, summarized, summary_hash)
+        self._lock = threading.Lock()  # Serialises writes to the same chats
+        self._last_sweep = 0.0
+
+    def _idle_limit(self):
+        return timezone.now() - timedelta(seconds=self.idle_seconds)
+
+    def messages(self, chat_id: str) -> List[dict]:
+        """Stored messages of a chat, oldest first ({"role", "content"})."""
+        cached = self._cache.get(chat_id)
+        if cached is not None:
+            return list(cached)
+        session = ChatSession.objects.filter(chat_id=chat_id).first()
+        if session is None:
+            return []
+        if session.last_active < self._idle_limit():
+            session.delete()
+            self._summaries.pop(chat_id)
+            return []
+        messages = [
+            {"role": role, "content": content}
+            for role, content in session.turns.order_by('index').values_list('role', 'content')
+        ]
+        self._cache.put(chat_id, tuple(messages))
+        return messages
+
+    def summary(self, chat_id: str) -> Tuple[str, int, str]:
+        """A chat's rolling summary: (text, number of messages folded into it, hash of those messages)."""
+        cached = self._summaries.get(chat_id)
+        if cached is not None:
+            return cached
+        row = ChatSession.objects.filter(chat_id=chat_id).values_list(
+            'summary', 'summarized', 'summary_hash'
+        ).first()
+        summary = tuple(row) if row is not None else ('', 0, '')
+        self._summaries.put(chat_id, summary)
+        return summary
+
+    def save_summary(self, chat_id: str, text: str, summarized: int, summary_hash: str) -> None:
+        with self._lock:
+            ChatSession.objects.filter(chat_id=chat_id).update(
+                summary=text, summarized=summarized, summary_hash=summary_hash
+            )
+            self._summaries.put(chat_id, (text, summarized, summary_hash))
+
+    def resolve(self, chat_id: str, history: List[dict] = None, cursor: int = None) -> List[dict]:
+        """Return the history to answer from, reconciling the store with the client.
+
+        With a cursor (the number of messages the client holds), the stored
+        history is used as is; a mismatch raises SessionConflict. Without one,
+        the client history wins: its new messages are appended, or the chat is
+        rewritten if it diverges from what is stored.
+        """
+        stored = self.messages(chat_id)
+        if cursor is not None:
+            if cursor != len(stored):
+                raise SessionConflict(len(stored))
+            return stored
+        if history is None:
+            return stored
+        if history[:len(stored)] == stored:
+            if len(history) > len(stored):
+                self.append(chat_id, history[len(stored):])
+        else:
+            self._rewrite(chat_id, history)
+        return list(history)
+
+    def append(self, chat_id: str, messages: List[dict]) -> int:
+        """Append messages to a chat. Return the new cursor (stored message count)."""
+        with self._lock:
+            with transaction.atomic():
+                session, _ = ChatSession.objects.get_or_create(
+                    chat_id=chat_id, defaults={'last_active': timezone.now()}
+                )
+                ChatTurn.objects.bulk_create([
+                    ChatTurn(session=session, index=session.message_count + offset,
+                             role=message['role'], content=message['content'])
+                    for offset, message in enumerate(messages)
+                ])
+                session.message_count += len(messages)
+                session.last_active = timezone.now()
+                session.save(update_fields=['message_count', 'last_active'])
+            cached = self._cache.peek(chat_id)
+            if cached is not None:
+                self._cache.put(chat_id, cached + tuple(messages))
+        self._maybe_sweep()
+        return session.message_count
+
+    def _rewrite(self, chat_id: str, messages: List[dict]) -> None:
+        with self._lock:
+            with transaction.atomic():
+                ChatSession.objects.filter(chat_id=chat_id).delete()
+                self._cache.pop(chat_id)
+                self._summaries.pop(chat_id)
+        if messages:
+            self.append(chat_id, messages)
+
+    def forget(self, chat_id: str) -> None:
+        self._rewrite(chat_id, [])
+
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        try:
+            self.expire_idle()
+        except Exception as e:
+            logger.error(f"Error expiring idle chat sessions: {str(e)}")
+
+    def expire_idle(self) -> int:
+        """Delete chats idle for longer than idle_seconds. Return how many were deleted."""
+        idle = ChatSession.objects.filter(last_active__lt=self._idle_limit())
+        chat_ids = list(idle.values_list('chat_id', flat=True))
+        if not chat_ids:
+            return 0
+        idle.delete()
+        for chat_id in chat_ids:
+            self._cache.pop(chat_id)
+            self._summaries.pop(chat_id)
+        logger.info(f"Expired {len(chat_ids)} idle chat sessions")
+        return len(chat_ids)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'sessions': ChatSession.objects.count(),
+            'idle_seconds': self.idle_seconds,
+            'cache': self._cache.stats(),
+            'summary_cache': self._summaries.stats(),
+        }
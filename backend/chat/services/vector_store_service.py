@@ -1,52 +1,178 @@
 import logging
+import time
+from dataclasses import dataclass, field
 from typing import List, Dict, Any
 from langchain.schema import Document
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
 from django.conf import settings
+from django.db.models import F
 import chromadb
 from chromadb.config import Settings
 import shutil
 import os
+import uuid
+from ..models import CollectionGeneration, Document as DBDocument
+from .embedding_backend import build_embeddings
+from .lru_cache import LRUCache, normalize_query
+from .lexical_index import LexicalIndex, reciprocal_rank_fusion
+from .metrics import observe_ms, span
+
+RETRIEVAL_MODES = ('vector', 'lexical', 'hybrid')
 
 logger = logging.getLogger(__name__)
 
+@dataclass
+class RetrievalResult:
+    """Documents kept by a retrieval, with their relevance scores and stage timings."""
+    documents: List[Document] = field(default_factory=list)
+    scores: List[float] = field(default_factory=list)
+    ids: List[str] = field(default_factory=list)  # Chroma ids of the documents
+    mode: str = 'vector'  # Scores are relevance for 'vector', BM25 for 'lexical', RRF for 'hybrid'
+    embed_ms: float = 0.0
+    search_ms: float = 0.0
+    lexical_ms: float = 0.0
+    cached: bool = False  # Served from the retrieval cache
+
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "scores": self.scores,
+            "embed_ms": self.embed_ms,
+            "search_ms": self.search_ms,
+            "lexical_ms": self.lexical_ms,
+            "cached": self.cached,
+        }
+
 class VectorStoreService:
     
-    def __init__(self):
-        self.embeddings = FastEmbedEmbeddings()
+    def __init__(self, embeddings=None):
+        # The shared embedding backend (settings.EMBEDDING_BACKEND); known chunks are
+        # served from the on-disk cache instead of being re-embedded
+        self.embeddings = embeddings or build_embeddings()
+        # Normalised query -> embedding, and (query, k, threshold, generation) -> ranked chunk ids and scores
+        self.query_cache = LRUCache(getattr(settings, 'QUERY_EMBEDDING_CACHE_SIZE', 1024))
+        self.retrieval_cache = LRUCache(getattr(settings, 'RETRIEVAL_CACHE_SIZE', 1024))
+        # BM25 index over the same chunks, for exact identifiers the embeddings miss
+        self.lexical_index = LexicalIndex()
+        self.retrieval_mode = getattr(settings, 'RETRIEVAL_MODE', 'hybrid')
+        self.hybrid_candidates = getattr(settings, 'RETRIEVAL_HYBRID_CANDIDATES', 20)
+        self.rrf_k = getattr(settings, 'RETRIEVAL_RRF_K', 60)
+        # Relevance floor of lexical hits, the counterpart of score_threshold for vector hits
+        self.lexical_min_score = getattr(settings, 'RETRIEVAL_LEXICAL_MIN_SCORE', 5.0)
         
         # Initialize vector store with existing database if it exists
         persist_dir = settings.CHROMA_SETTINGS["persist_directory"]
+        self.collection_name = "documents"
         self.vector_store = Chroma(
             persist_directory=persist_dir,
             embedding_function=self.embeddings,
-            collection_name="documents"
+            collection_name=self.collection_name
         )
         
-        collection_size = len(self.vector_store.get()['ids'])
-        logger.info(f"Initialized Chroma database with {collection_size} existing documents")
+        self.persist_dir = persist_dir
+        
+        logger.info(f"Initialized Chroma database with {self.count()} existing documents")
+
+    def count(self) -> int:
+        """Number of chunks in the collection, from Chroma's native count."""
+        return self.vector_store._collection.count()
+
+    @property
+    def generation(self) -> int:
+        """Change counter of the collection, bumped on every add/delete.
 
-    def add_documents(self, documents: List[Document]) -> None:
-        """Add documents to the vector store."""
+        It lives in the database, so a change made by any worker process
+        expires the retrieval and router caches of all of them.
+        """
+        return (CollectionGeneration.objects.filter(collection=self.collection_name)
+                .values_list('value', flat=True).first()) or 0
+
+    def _bump_generation(self) -> None:
+        CollectionGeneration.objects.get_or_create(collection=self.collection_name)
+        CollectionGeneration.objects.filter(collection=self.collection_name).update(value=F('value') + 1)
+        # Entries of older generations can no longer be hit
+        self.retrieval_cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Collection statistics that do not materialise the collection."""
+        size_bytes = 0
+        for root, _, files in os.walk(self.persist_dir):
+            for name in files:
+                try:
+                    size_bytes += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass  # File removed while walking
+        return {
+            "chunks": self.count(),
+            "documents": DBDocument.objects.count(),
+            "bytes": size_bytes,
+            "generation": self.generation,
+            "lexical_chunks": self.lexical_index.count(),
+            "embedding_cache": self.embeddings.stats(),
+            "query_cache": self.query_cache.stats(),
+            "retrieval_cache": self.retrieval_cache.stats(),
+        }
+
+    @staticmethod
+    def chunk_id(metadata: Dict[str, Any]) -> str:
+        """Deterministic Chroma id of a chunk: <chroma_id>:<chunk_id>."""
+        return f"{metadata['chroma_id']}:{metadata['chunk_id']}"
+
+    def add_documents(self, documents: List[Document], persist: bool = True) -> Dict[str, int]:
+        """Add documents to the vector store.
+
+        Bulk loaders pass persist=False for each batch and call persist() once at the end.
+        Return the embedding cache hits and misses for the batch.
+        """
         try:
-            # Add documents
-            self.vector_store.add_documents(documents)
-            self.vector_store.persist()
+            if not documents:
+                return {"cache_hits": 0, "cache_misses": 0}
+
+            # Add documents under deterministic ids so a document's chunks can be addressed directly
+            if all('chroma_id' in doc.metadata and 'chunk_id' in doc.metadata for doc in documents):
+                ids = [self.chunk_id(doc.metadata) for doc in documents]
+            else:
+                ids = [str(uuid.uuid4()) for _ in documents]
+
+            texts = [doc.page_content for doc in documents]
+            with span('ingest_embed'):
+                vectors, hits, misses = self.embeddings.embed_documents_with_stats(texts)
+            with span('ingest_index'):
+                self.vector_store._collection.add(
+                    ids=ids,
+                    embeddings=vectors,
+                    metadatas=[doc.metadata for doc in documents],
+                    documents=texts
+                )
+                self.lexical_index.add(documents, ids)
+            if persist:
+                self.persist()
+            self._bump_generation()
             
-            # Verify size after addition
-            collection_size = len(self.vector_store.get()['ids'])
-            logger.info(f"Vector store now contains {collection_size} documents")
+            logger.info(f"Vector store now contains {self.count()} documents ({hits} embeddings from cache)")
+            return {"cache_hits": hits, "cache_misses": misses}
             
         except Exception as e:
             logger.error(f"Error adding documents to vector store: {str(e)}")
             raise
 
+    def persist(self) -> None:
+        """Flush the collection to disk."""
+        self.vector_store.persist()
+
     def search_documents(self, query: str, k: int = 6) -> List[Document]:
-        """Search for relevant documents based on query."""
+        """Search for the k documents nearest to a query, without a relevance threshold.
+
+        Shares the query embedding cache and the generation-keyed retrieval cache with retrieve().
+        """
         try:
+            key = (normalize_query(query), k, None, 'search', self.generation)
+            cached = self._cached_retrieval(key, 'vector')
+            if cached is not None:
+                return cached.documents
+
             # Vérifier que la collection n'est pas vide
-            collection_size = len(self.vector_store.get()['ids'])
+            collection_size = self.count()
             if collection_size == 0:
                 logger.warning("Vector store is empty!")
                 return []
@@ -54,7 +180,11 @@ class VectorStoreService:
             logger.info(f"Searching in {collection_size} documents")
             
             # Rechercher les documents
-            results = self.vector_store.similarity_search(query, k=k)
+            hits = self._vector_search(query, k, float('-inf'), RetrievalResult())
+            self.retrieval_cache.put(
+                key, (tuple(chunk_id for chunk_id, _, _ in hits), tuple(score for _, _, score in hits))
+            )
+            results = [doc for _, doc, _ in hits]
             
             # Log les résultats
             logger.info(f"Found {len(results)} relevant documents")
@@ -67,27 +197,163 @@ class VectorStoreService:
             logger.error(f"Error searching documents: {str(e)}")
             raise
 
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a query, reusing the embedding of an identical normalised query."""
+        key = normalize_query(query)
+        embedding = self.query_cache.get(key)
+        if embedding is None:
+            embedding = self.embeddings.embed_query(query)
+            self.query_cache.put(key, embedding)
+        return embedding
+
+    def _cached_retrieval(self, key, mode: str) -> RetrievalResult:
+        """Rebuild a cached retrieval from its chunk ids, None if it cannot be served."""
+        cached = self.retrieval_cache.get(key)
+        if cached is None:
+            return None
+        ids, scores = cached
+        result = RetrievalResult(mode=mode, cached=True)
+        if ids:
+            found = self.vector_store._collection.get(ids=list(ids), include=["documents", "metadatas"])
+            by_id = {
+                chunk_id: Document(page_content=text, metadata=metadata or {})
+                for chunk_id, text, metadata in zip(found["ids"], found["documents"], found["metadatas"])
+            }
+            if len(by_id) != len(ids):
+                return None  # Removed outside this service
+            result.documents = [by_id[chunk_id] for chunk_id in ids]
+            result.scores = list(scores)
+            result.ids = list(ids)
+        return result
+
+    def _vector_search(self, query: str, k: int, score_threshold: float, result: RetrievalResult) -> List[tuple]:
+        """Dense search. Return (chunk id, document, relevance) above the threshold, best first."""
+        start = time.perf_counter()
+        embedding = self.embed_query(query)
+        embedded = time.perf_counter()
+
+        found = self.vector_store._collection.query(
+            query_embeddings=[embedding],
+            n_results=k,
+            include=["documents", "metadatas", "distances"]
+        )
+        relevance_fn = self.vector_store._select_relevance_score_fn()
+        result.embed_ms = (embedded - start) * 1000
+        result.search_ms = (time.perf_counter() - embedded) * 1000
+
+        hits = []
+        for chunk_id, text, metadata, distance in zip(
+            found["ids"][0], found["documents"][0], found["metadatas"][0], found["distances"][0]
+        ):
+            score = relevance_fn(distance)
+            if score >= score_threshold:
+                hits.append((chunk_id, Document(page_content=text, metadata=metadata or {}), score))
+        return hits
+
+    def retrieve(self, query: str, k: int = 5, score_threshold: float = 0.1, mode: str = None) -> RetrievalResult:
+        """Retrieve the k chunks best matching a query.
+
+        mode is 'vector' (dense search, hits above score_threshold), 'lexical'
+        (BM25 over the full-text index, no embedding) or 'hybrid' (both
+        candidate lists fused by reciprocal rank); settings.RETRIEVAL_MODE by
+        default. Lexical hits must score RETRIEVAL_LEXICAL_MIN_SCORE, so hybrid
+        mode does not bring back chunks that only share common words with the
+        query. Results are cached by normalised query, k, threshold, mode and
+        collection generation.
+        """
+        try:
+            mode = mode or self.retrieval_mode
+            if mode not in RETRIEVAL_MODES:
+                raise ValueError(f"Unknown retrieval mode: {mode}")
+
+            start = time.perf_counter()
+            key = (normalize_query(query), k, score_threshold, mode, self.generation)
+            result = self._cached_retrieval(key, mode)
+            if result is not None:
+                result.search_ms = (time.perf_counter() - start) * 1000
+                observe_ms('retrieval', result.search_ms)
+                logger.info(f"Retrieved {len(result.documents)} chunks from cache ({result.search_ms:.1f}ms)")
+                return result
+
+            result = RetrievalResult(mode=mode)
+            candidates = self.hybrid_candidates if mode == 'hybrid' else k
+            vector_hits, lexical_hits = [], []
+            if mode != 'lexical':
+                vector_hits = self._vector_search(query, candidates, score_threshold, result)
+            if mode != 'vector':
+                lexical_start = time.perf_counter()
+                lexical_hits = self.lexical_index.search(query, candidates, self.lexical_min_score)
+                result.lexical_ms = (time.perf_counter() - lexical_start) * 1000
+
+            if mode == 'hybrid':
+                fused = reciprocal_rank_fusion(
+                    [[chunk_id for chunk_id, _, _ in vector_hits], [chunk_id for chunk_id, _, _ in lexical_hits]],
+                    self.rrf_k
+                )
+                documents = {chunk_id: doc for chunk_id, doc, _ in lexical_hits + vector_hits}
+                ranked = sorted(fused, key=fused.get, reverse=True)[:k]
+                hits = [(chunk_id, documents[chunk_id], fused[chunk_id]) for chunk_id in ranked]
+            else:
+                hits = (vector_hits or lexical_hits)[:k]
+
+            for chunk_id, doc, score in hits:
+                result.ids.append(chunk_id)
+                result.documents.append(doc)
+                result.scores.append(score)
+            self.retrieval_cache.put(key, (tuple(result.ids), tuple(result.scores)))
+
+            if mode != 'lexical':
+                observe_ms('query_embedding', result.embed_ms)
+                observe_ms('vector_search', result.search_ms)
+            if mode != 'vector':
+                observe_ms('lexical_search', result.lexical_ms)
+            observe_ms('retrieval', (time.perf_counter() - start) * 1000)
+
+            logger.info(
+                f"Retrieved {len(result.documents)} chunks ({mode}: {len(vector_hits)} vector, "
+                f"{len(lexical_hits)} lexical candidates; embed {result.embed_ms:.1f}ms, "
+                f"search {result.search_ms:.1f}ms, lexical {result.lexical_ms:.1f}ms)"
+            )
+            return result
+
+        except Exception as e:
+            logger.error(f"Error retrieving documents: {str(e)}")
+            raise
+
     def delete_document(self, chroma_id: str) -> None:
         """Delete all chunks of a document from the vector store."""
+        self.delete_documents([chroma_id])
+
+    def delete_documents(self, chroma_ids: List[str]) -> int:
+        """Delete all chunks of several documents with one metadata-filtered delete.
+
+        Return the number of chunks removed.
+        """
         try:
-            # Récupérer tous les documents
-            results = self.vector_store.get()
-            
-            # Trouver les IDs des chunks à supprimer
-            ids_to_delete = []
-            for i, metadata in enumerate(results['metadatas']):
-                if metadata.get('chroma_id') == chroma_id:
-                    ids_to_delete.append(results['ids'][i])
-            
-            if ids_to_delete:
-                # Supprimer les chunks
-                self.vector_store._collection.delete(
-                    ids=ids_to_delete
-                )
-                logger.info(f"Deleted {len(ids_to_delete)} chunks for document with chroma_id {chroma_id}")
+            chroma_ids = [chroma_id for chroma_id in chroma_ids if chroma_id]
+            if not chroma_ids:
+                return 0
+
+            # Chroma resolves the filter through its metadata index, no collection scan
+            if len(chroma_ids) == 1:
+                where = {"chroma_id": chroma_ids[0]}
+            else:
+                # $or of equalities rather than $in, which chromadb 0.3.x's where-validator rejects
+                where = {"$or": [{"chroma_id": chroma_id} for chroma_id in chroma_ids]}
+
+            # Count the matching chunks themselves: a collection count() before and after
+            # would include chunks added meanwhile by other ingestions
+            deleted = len(self.vector_store._collection.get(where=where, include=[])["ids"])
+            self.vector_store._collection.delete(where=where)
+            self.lexical_index.delete(chroma_ids)
+
+            if deleted:
+                self._bump_generation()
+                logger.info(f"Deleted {deleted} chunks for {len(chroma_ids)} document(s)")
             else:
-                logger.warning(f"No chunks found for document with chroma_id {chroma_id}")
+                logger.warning(f"No chunks found for documents with chroma_id {', '.join(chroma_ids)}")
+            return deleted
                 
         except Exception as e:
-            logger.error(f"Error deleting document: {str(e)}")
-            raise
\ No newline at end of file
+            logger.error(f"Error deleting documents: {str(e)}")
+            raise
@@ -0,0 +1,119 @@
+import hashlib
+import math
+import os
+import shutil
+import tempfile
+import numpy as np
+from django.test import TestCase, override_settings
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+from chat.services.context_router import EmbeddingContextRouter
+from chat.services.embedding_cache import CachedEmbeddings, EmbeddingCache
+from chat.services.vector_store_service import VectorStoreService
+
+class WordHashEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings, so the tests need no model download."""
+
+    dim = 256
+
+    def embed_query(self, text: str):
+        vector = [0.0] * self.dim
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.strip('.,?!').encode()).hexdigest(), 16) % self.dim] += 1.0
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+class VectorStoreTestCase(TestCase):
+    """A real Chroma store in a temporary directory, with WordHashEmbeddings."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        chroma_settings = override_settings(CHROMA_SETTINGS={
+            "persist_directory": os.path.join(self.tmp, 'chroma'),
+            "anonymized_telemetry": False
+        })
+        chroma_settings.enable()
+        self.addCleanup(chroma_settings.disable)
+        self.embeddings = CachedEmbeddings(WordHashEmbeddings(), EmbeddingCache(os.path.join(self.tmp, 'cache.sqlite3')),
+                                           'test:word-hash')
+        self.store = VectorStoreService(embeddings=self.embeddings)
+
+    def add(self, chroma_id: str, texts):
+        self.store.add_documents([
+            Document(page_content=text, metadata={"chroma_id": chroma_id, "chunk_id": i, "filename": chroma_id})
+            for i, text in enumerate(texts)
+        ])
+
+class EmbeddingContextRouterTests(VectorStoreTestCase):
+    def test_in_corpus_question_uses_context(self):
+        self.add('manual', [
+            "The zorblat reactor coolant pressure must stay below 40 bar during startup.",
+            "Quarterly maintenance of the flux capacitor requires two technicians.",
+        ])
+        router = EmbeddingContextRouter(self.store)
+        query = "what coolant pressure for the zorblat reactor startup"
+
+        use_context, margin = router._score(query)
+
+        # The corpus similarity is a cosine, on the scale of the prototype similarities
+        q = np.array(self.store.embed_query(query))
+        chunk = np.array(self.store.embeddings.embed_query(
+            "The zorblat reactor coolant pressure must stay below 40 bar during startup."
+        ))
+        general = max(float(np.dot(p, q)) for p in router._general)
+        document = max(float(np.dot(p, q)) for p in router._document)
+        self.assertAlmostEqual(margin, abs(max(float(np.dot(chunk, q)), document) - general), places=5)
+        self.assertTrue(use_context)
+        decision = router.route(query)
+        self.assertTrue(decision.use_context)
+        self.assertEqual(decision.source, 'embedding')
+
+    def test_empty_corpus_is_not_cached(self):
+        router = EmbeddingContextRouter(self.store)
+        query = "what coolant pressure for the zorblat reactor"
+        self.assertEqual(router.route(query).source, 'empty_corpus')
+        self.add('manual', ["The zorblat reactor coolant pressure must stay below 40 bar."])
+        self.assertTrue(router.route(query).use_context)
+
+class DeleteDocumentsTests(VectorStoreTestCase):
+    def test_multi_document_delete(self):
+        self.add('a', ["alpha one", "alpha two"])
+        self.add('b', ["beta one"])
+        self.add('c', ["gamma one", "gamma two", "gamma three"])
+
+        deleted = self.store.delete_documents(['a', 'c'])
+
+        self.assertEqual(deleted, 5)
+        self.assertEqual(self.store.count(), 1)
+        self.assertEqual(self.store.vector_store._collection.get(include=["metadatas"])["metadatas"],
+                         [{"chroma_id": "b", "chunk_id": 0, "filename": "b"}])
+        self.assertEqual(self.store.delete_documents(['a', 'c']), 0)
+
+    def test_single_document_delete(self):
+        self.add('a', ["alpha one", "alpha two"])
+        self.assertEqual(self.store.delete_documents(['a']), 2)
+        self.assertEqual(self.store.count(), 0)
+
+class CollectionGenerationTests(VectorStoreTestCase):
+    def test_changes_expire_the_caches_of_other_workers(self):
+        # A second service over the same store and database, as in another worker process
+        other = VectorStoreService(embeddings=self.embeddings)
+        router = EmbeddingContextRouter(other)
+        self.add('manual', ["Quarterly maintenance of the flux capacitor requires two technicians."])
+        query = "how many technicians for flux capacitor maintenance"
+        self.assertFalse(other.retrieve(query, mode='lexical').cached)
+        self.assertEqual(router.route(query).source, 'embedding')
+        self.assertTrue(other.retrieve(query, mode='lexical').cached)
+        self.assertEqual(router.route(query).source, 'cache')
+
+        self.add('notes', ["The flux capacitor maintenance technicians sign the logbook."])
+
+        self.assertEqual(other.generation, self.store.generation)
+        self.assertFalse(other.retrieve(query, mode='lexical').cached)
+        self.assertEqual(router.route(query).source, 'embedding')
+        self.store.delete_documents(['notes'])
+        self.assertFalse(other.retrieve(query, mode='lexical').cached)
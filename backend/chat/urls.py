@@ -1,16 +1,23 @@
 from django.urls import path
 from .views import (
-    ChatView, DocumentUploadView, DocumentListView, 
-    DocumentContentView, ModelListView, ChatShareView
+    ChatView, ChatServicePoolView, DocumentUploadView, DocumentListView, 
+    DocumentContentView, ModelListView, ChatShareView, VectorStoreStatsView,
+    IngestionJobView, DocumentBatchUploadView, ModelPreloadView, MetricsView
 )
 
 urlpatterns = [
     path('chat/', ChatView.as_view(), name='chat'),
+    path('chat/pool/', ChatServicePoolView.as_view(), name='chat-pool'),
     path('documents/', DocumentListView.as_view(), name='document-list'),
     path('documents/<str:document_id>/', DocumentListView.as_view(), name='document-delete'),
     path('documents/<str:document_id>/content/', DocumentContentView.as_view(), name='document-content'),
+    path('stats/', VectorStoreStatsView.as_view(), name='vector-store-stats'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('upload/', DocumentUploadView.as_view(), name='document-upload'),
+    path('upload/batch/', DocumentBatchUploadView.as_view(), name='document-batch-upload'),
+    path('jobs/<str:job_id>/', IngestionJobView.as_view(), name='ingestion-job'),
     path('models/', ModelListView.as_view(), name='model-list'),
+    path('models/preload/', ModelPreloadView.as_view(), name='model-preload'),
     path('share-chat/', ChatShareView.as_view(), name='share-chat'),
     path('shared-chat/<str:chat_id>/', ChatShareView.as_view(), name='get-shared-chat'),
 ]
\ No newline at end of file
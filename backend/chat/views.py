@@ -6,47 +6,135 @@ from django.views.decorators.csrf import csrf_exempt
 import logging
 from .models import Document, SharedChat
 from .serializers import DocumentSerializer
-from .services.document_service import DocumentService
-from .services.vector_store_service import VectorStoreService
-from .services.chat_service import ChatService
+from .services.concurrency import QueueFull
+from .services.session_store import SessionConflict
+from .services.document_reader import (
+    InvalidRequest, list_documents, document_info, resolve_range, read_slice, stream_slices
+)
+from .services.registry import (
+    vector_store_service, document_service, answer_cache, session_store,
+    chat_service_pool, ingestion_service, ollama_limiter, model_catalog, service_stats
+)
 import os
 import uuid
-import gc
-from PyPDF2 import PdfReader
-from sentence_transformers import SentenceTransformer, util
-import torch
-from django.http import StreamingHttpResponse
-import subprocess
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from django.core.handlers.asgi import ASGIRequest
+from django.conf import settings
+import asyncio
 import json
 
 logger = logging.getLogger(__name__)
 
-# Initialize services
-vector_store_service = VectorStoreService()
-document_service = DocumentService()
+# Services live in chat.services.registry and are built on first use
 
-@method_decorator(csrf_exempt, name='dispatch')
-class ChatView(APIView):
-    def post(self, request):
-        message = request.data.get('message', '')
-        history = request.data.get('history', [])
-        chat_id = request.data.get('chatId', '')
-        model_name = request.data.get('model', 'llama2')  # Default to llama2 if not specified
-        
-        # Create chat service with selected model
-        chat_service = ChatService(vector_store_service, model_name=model_name)
-        
-        # Map the history roles correctly
+def sse_event(event: str, data) -> str:
+    """Frame one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def parse_chat_request(data):
+    """Extract message, chat id, model, role-normalised history, answer cache use and cursor from a chat request.
+
+    Clients that know the chat's cursor (the number of messages the server
+    holds for it) send it instead of the history; history is None then.
+    """
+    message = data.get('message', '')
+    history = data.get('history')
+    chat_id = data.get('chatId', '')
+    model_name = data.get('model', 'llama2')  # Default to llama2 if not specified
+    use_cache = not data.get('noCache', False)  # Force a fresh answer
+    cursor = data.get('cursor')
+    if not isinstance(cursor, int) or isinstance(cursor, bool):
+        cursor = None
+
+    # Map the history roles correctly
+    formatted_history = None
+    if history is not None:
         formatted_history = []
         for msg in history:
             role = msg.get('role', '')
             # Map 'ai' role to 'assistant'
             if role == 'ai':
                 role = 'assistant'
+            if role not in ('human', 'assistant'):
+                continue
             formatted_history.append({
                 'role': role,
                 'content': msg.get('content', '')
             })
+    return message, chat_id, model_name, formatted_history, use_cache, cursor
+
+def session_conflict_payload(error: SessionConflict) -> dict:
+    return {
+        'error': 'Chat history out of sync, resend the full history',
+        'cursor': error.cursor
+    }
+
+def queue_full_payload(error: QueueFull) -> dict:
+    return {
+        'error': 'Too many chats in progress, please retry shortly',
+        'queue_position': error.queue_position
+    }
+
+def stream_chat(chat_service, message: str, chat_id: str, use_cache: bool):
+    """SSE events of one answer, for WSGI servers (a worker thread per streaming chat)."""
+    # The slot is taken once the body is read: a response that is never iterated
+    # (client gone, discarded by middleware) must not hold it, and closing a
+    # generator that never started skips its finally
+    try:
+        ticket = ollama_limiter().enter()
+    except QueueFull as e:
+        yield sse_event('error', queue_full_payload(e))
+        return
+    try:
+        if ticket.position:
+            yield sse_event('queued', {'position': ticket.position})
+            ticket.wait(settings.OLLAMA_QUEUE_TIMEOUT)
+        events = chat_service.generate_response(
+            message,
+            chat_id,
+            stream=True,
+            use_cache=use_cache
+        )
+        for event in events:
+            yield sse_event(event['event'], event['data'])
+    except Exception as e:
+        logger.error(f"Error in chat: {str(e)}")
+        yield sse_event('error', {'error': 'An error occurred processing your request'})
+    finally:
+        ticket.release()
+
+async def astream_chat(chat_service, message: str, chat_id: str, use_cache: bool):
+    """SSE events of one answer, for ASGI servers: holds no thread while Ollama generates."""
+    try:
+        ticket = ollama_limiter().enter()
+    except QueueFull as e:
+        yield sse_event('error', queue_full_payload(e))
+        return
+    try:
+        if ticket.position:
+            yield sse_event('queued', {'position': ticket.position})
+            await asyncio.wait_for(ticket.wait_async(), settings.OLLAMA_QUEUE_TIMEOUT)
+        async for event in chat_service.agenerate_response(message, chat_id, use_cache=use_cache):
+            yield sse_event(event['event'], event['data'])
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Error in async chat: {str(e)}")
+        yield sse_event('error', {'error': 'An error occurred processing your request'})
+    finally:
+        ticket.release()
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ChatView(APIView):
+    def post(self, request):
+        """Stream an answer as server-sent events.
+
+        Served through rag_chat.asgi, the answer streams from the async
+        generator on the event loop; Django would read a sync iterator there
+        with sync_to_async(list), buffering the whole answer.
+        """
+        message, chat_id, model_name, formatted_history, use_cache, cursor = parse_chat_request(request.data)
         
         if not message or not chat_id:
             return Response(
@@ -54,28 +142,109 @@ class ChatView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # The service reads the history from the session store
         try:
-            response = chat_service.generate_response(
-                message, 
-                chat_id, 
-                formatted_history
-            )
-            
-            def stream_response():
-                for chunk in response:
-                    yield chunk
+            session_store().resolve(chat_id, formatted_history, cursor)
+        except SessionConflict as e:
+            return Response(session_conflict_payload(e), status=status.HTTP_409_CONFLICT)
 
-            return StreamingHttpResponse(
-                streaming_content=stream_response(),
-                content_type='text/event-stream'
-            )
+        # Reuse the warm chat service for the selected model (sync views run in a
+        # worker thread under ASGI too, so building it does not block the event loop)
+        chat_service = chat_service_pool().get(model_name)
 
-        except Exception as e:
-            logger.error(f"Error in chat: {str(e)}")
-            return Response(
-                {'error': 'An error occurred processing your request'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        if isinstance(request._request, ASGIRequest):
+            events = astream_chat(chat_service, message, chat_id, use_cache)
+        else:
+            events = stream_chat(chat_service, message, chat_id, use_cache)
+        response = StreamingHttpResponse(
+            streaming_content=events,
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Let proxies flush each event immediately
+        return response
+
+class ChatServicePoolView(APIView):
+    def get(self, request):
+        """Expose per-model pool counters (hits, misses, load times) and Ollama slot usage."""
+        from .services.ollama_client import ollama_metrics
+        data = chat_service_pool().stats()
+        data['ollama'] = ollama_limiter().stats()
+        data['ollama']['models'] = ollama_metrics.stats()  # Load vs generation time per model
+        data['sessions'] = session_store().stats()
+        data['services'] = service_stats()  # Build time of each lazily created service
+        return Response(data)
+
+class MetricsView(View):
+    def get(self, request):
+        """Stage latency histograms and chat counters in Prometheus text format."""
+        from .services.metrics import metrics
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+class VectorStoreStatsView(APIView):
+    def get(self, request):
+        """Chunk/document counts, on-disk size and generation of the vector store, and cache counters."""
+        data = vector_store_service().stats()
+        data['answer_cache'] = answer_cache().stats() if answer_cache() is not None else None
+        return Response(data)
+
+SUPPORTED_EXTENSIONS = ['pdf', 'md', 'txt']
+
+def queue_upload(file) -> dict:
+    """Spool an uploaded file, create its Document row and queue its ingestion job.
+
+    A file identical to an indexed document is linked to it instead (no job_id);
+    one identical to an upload still being ingested is linked to its running job.
+    """
+    file_extension = os.path.splitext(file.name)[1].lower()[1:]
+
+    # Keep the upload on disk, the request's file is gone once we respond
+    spool_path, file_hash = document_service().spool_upload(file)
+
+    # The same file was already uploaded: link to it instead of re-indexing
+    existing = Document.objects.filter(content_hash=file_hash).only('id', 'chroma_id', 'name').first()
+    if existing is not None:
+        os.remove(spool_path)
+        return {
+            'document_id': existing.id,
+            'chroma_id': existing.chroma_id,
+            'duplicate_of': existing.name,
+            'cache_hit_rate': 1.0
+        }
+    running = ingestion_service().active_job(file_hash)
+    if running is not None:
+        os.remove(spool_path)
+        return {
+            'document_id': running.document_id,
+            'chroma_id': running.chroma_id,
+            'duplicate_of': running.filename,
+            'job_id': running.id,
+            'status_url': f'/api/jobs/{running.id}/'
+        }
+
+    # Générer un chroma_id unique
+    chroma_id = str(uuid.uuid4())
+    
+    # Créer le document avec le chroma_id, le contenu et le hash sont remplis par le job
+    document = Document.objects.create(
+        name=file.name,
+        file_type=file_extension,
+        content='',
+        chroma_id=chroma_id
+    )
+
+    # Extraction, chunking and embedding run in the background
+    job = ingestion_service().submit(document, spool_path, file_extension, content_hash=file_hash)
+
+    return {
+        'document_id': document.id,
+        'chroma_id': chroma_id,
+        'job_id': job.id,
+        'status_url': f'/api/jobs/{job.id}/'
+    }
+
+def is_supported(file) -> bool:
+    return os.path.splitext(file.name)[1].lower()[1:] in SUPPORTED_EXTENSIONS
 
 class DocumentUploadView(APIView):
     def post(self, request):
@@ -87,46 +256,27 @@ class DocumentUploadView(APIView):
             )
 
         try:
-            file_extension = os.path.splitext(file.name)[1].lower()[1:]
-            if file_extension not in ['pdf', 'md', 'txt']:
+            if not is_supported(file):
                 return Response(
                     {'error': 'File extension not supported'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Process and store document
-            content = document_service.process_file(file, file_extension)
-            gc.collect()
-
-            # Générer un chroma_id unique
-            chroma_id = str(uuid.uuid4())
-            
-            # Créer le document avec le chroma_id
-            document = Document.objects.create(
-                name=file.name,
-                file_type=file_extension,
-                content=content,
-                chroma_id=chroma_id
-            )
-
-            # Prepare and store in vector database
-            documents = document_service.store_document(
-                content,
-                {"filename": file.name, "id": str(document.id), "chroma_id": chroma_id}
-            )
-            
-            # Ajouter les documents au vector store par lots
-            batch_size = 5
-            for i in range(0, len(documents), batch_size):
-                batch = documents[i:i + batch_size]
-                vector_store_service.add_documents(batch)
-                gc.collect()
-
+            upload = queue_upload(file)
+            if 'duplicate_of' in upload and 'job_id' in upload:
+                return Response({
+                    'message': 'Document already being indexed',
+                    **upload
+                }, status=status.HTTP_202_ACCEPTED)
+            if 'duplicate_of' in upload:
+                return Response({
+                    'message': 'Document already indexed',
+                    **upload
+                }, status=status.HTTP_200_OK)
             return Response({
-                'message': 'Upload successful',
-                'document_id': document.id,
-                'chroma_id': chroma_id
-            }, status=status.HTTP_201_CREATED)
+                'message': 'Upload accepted',
+                **upload
+            }, status=status.HTTP_202_ACCEPTED)
 
         except Exception as e:
             logger.error(f"Error in document upload: {str(e)}")
@@ -135,17 +285,82 @@ class DocumentUploadView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+class DocumentBatchUploadView(APIView):
+    def post(self, request):
+        """Queue every file of a multi-file upload ('files' field), one ingestion job each."""
+        files = request.FILES.getlist('files')
+        if not files:
+            return Response(
+                {'error': 'No files provided'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = []
+        for file in files:
+            if not is_supported(file):
+                results.append({'filename': file.name, 'error': 'File extension not supported'})
+                continue
+            try:
+                results.append({'filename': file.name, **queue_upload(file)})
+            except Exception as e:
+                logger.error(f"Error in batch upload of {file.name}: {str(e)}")
+                results.append({'filename': file.name, 'error': str(e)})
+
+        accepted = sum(1 for result in results if 'document_id' in result)
+        return Response({
+            'message': f'{accepted}/{len(files)} uploads accepted',
+            'uploads': results
+        }, status=status.HTTP_202_ACCEPTED if accepted else status.HTTP_400_BAD_REQUEST)
+
+class IngestionJobView(APIView):
+    def get(self, request, job_id):
+        """Report an upload's stage, chunk progress and throughput."""
+        job = ingestion_service().get(job_id)
+        if job is None:
+            return Response(
+                {'error': 'Job not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(job.as_dict())
+
+def int_param(request, name: str, default=None):
+    """An integer query parameter; InvalidRequest if it is not one."""
+    value = request.query_params.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise InvalidRequest(f"Invalid {name}: {value}")
+
 class DocumentListView(APIView):
     def get(self, request):
-        documents = Document.objects.all()
+        """A page of documents: ?limit, ?sort, ?cursor (next_cursor of the previous page), ?file_type, ?q."""
+        max_limit = getattr(settings, 'DOCUMENT_LIST_MAX_PAGE_SIZE', 200)
+        try:
+            limit = int_param(request, 'limit', getattr(settings, 'DOCUMENT_LIST_PAGE_SIZE', 50))
+            file_types = [t for t in request.query_params.get('file_type', '').split(',') if t]
+            documents, next_cursor = list_documents(
+                limit=min(max(limit, 1), max_limit),
+                sort=request.query_params.get('sort', '-upload_date'),
+                cursor=request.query_params.get('cursor') or None,
+                file_types=file_types,
+                name=request.query_params.get('q') or None,
+            )
+        except InvalidRequest as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         serializer = DocumentSerializer(documents, many=True)
-        return Response(serializer.data)
+        return Response({'results': serializer.data, 'next_cursor': next_cursor})
     
-    def delete(self, request, document_id):
+    def delete(self, request, document_id=None):
+        if document_id is None:
+            return self._bulk_delete(request)
         try:
             document = Document.objects.get(id=document_id)
             # Supprimer d'abord de ChromaDB
-            vector_store_service.delete_document(document.chroma_id)
+            vector_store_service().delete_document(document.chroma_id)
+            if answer_cache() is not None:
+                answer_cache().invalidate_documents([document.chroma_id])
             # Puis supprimer de la base de données
             document.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
@@ -158,20 +373,69 @@ class DocumentListView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def _bulk_delete(self, request):
+        """Delete every document listed in the body's 'ids' in one vector store call."""
+        ids = request.data.get('ids', [])
+        if not ids:
+            return Response(
+                {'error': 'No document ids provided'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            documents = Document.objects.filter(id__in=ids)
+            chroma_ids = list(documents.values_list('chroma_id', flat=True))
+            vector_store_service().delete_documents(chroma_ids)
+            if answer_cache() is not None:
+                answer_cache().invalidate_documents(chroma_ids)
+            deleted, _ = documents.delete()
+            return Response({'deleted': deleted})
+        except Exception as e:
+            logger.error(f"Error deleting documents: {str(e)}")
+            return Response(
+                {'error': 'An error occurred while deleting the documents'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
 class DocumentContentView(APIView):
     def get(self, request, document_id):
-        try:
-            document = Document.objects.get(id=document_id)
-            return Response({
-                'content': document.content,
-                'name': document.name,
-                'file_type': document.file_type
-            })
-        except Document.DoesNotExist:
+        """A character range of a document's text: ?start&length, or ?page=N.
+
+        JSON responses hold at most DOCUMENT_CONTENT_MAX_CHARS characters and
+        give next_start to continue from. ?stream=1 streams the range (the
+        rest of the document by default) as plain text, read block by block.
+        """
+        info = document_info(document_id)
+        if info is None:
             return Response(
                 {'error': 'Document not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        block_chars = getattr(settings, 'DOCUMENT_CONTENT_BLOCK_CHARS', 65536)
+        streamed = request.query_params.get('stream') in ('1', 'true')
+        try:
+            length = int_param(request, 'length', None if streamed else block_chars)
+            if length is not None and not streamed:
+                length = min(length, getattr(settings, 'DOCUMENT_CONTENT_MAX_CHARS', 1048576))
+            span = resolve_range(info, start=int_param(request, 'start'), length=length,
+                                 page=int_param(request, 'page'))
+        except InvalidRequest as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if streamed:
+            response = StreamingHttpResponse(
+                stream_slices(document_id, span['start'], span['end'], block_chars),
+                content_type='text/plain; charset=utf-8'
+            )
+            response['X-Content-Start'] = str(span['start'])
+            response['X-Content-End'] = str(span['end'])
+            response['X-Content-Total-Length'] = str(span['total_length'])
+            return response
+        return Response({
+            'content': read_slice(document_id, span['start'], span['end'] - span['start']),
+            'name': info['name'],
+            'file_type': info['file_type'],
+            **span,
+        })
 
 @method_decorator(csrf_exempt, name='dispatch')
 class ChatShareView(APIView):
@@ -224,29 +488,33 @@ class ChatShareView(APIView):
             )
 
 @method_decorator(csrf_exempt, name='dispatch')
+class ModelPreloadView(APIView):
+    def post(self, request):
+        """Start loading a model into Ollama, e.g. as soon as the user selects it."""
+        model_name = request.data.get('model')
+        if not model_name:
+            return Response({'error': 'No model provided'}, status=status.HTTP_400_BAD_REQUEST)
+        from .services.ollama_client import preload_in_background
+        preload_in_background([model_name])
+        return Response({'model': model_name, 'status': 'loading'}, status=status.HTTP_202_ACCEPTED)
+
 class ModelListView(APIView):
     def get(self, request):
+        """Installed Ollama models (names plus size, family and quantization), served from the catalog cache.
+
+        ?refresh=1 bypasses the cache.
+        """
         try:
-            # Run 'ollama list' command
-            result = subprocess.run(['ollama', 'list'], capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                return Response(
-                    {'error': 'Failed to get models list'},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-            
-            # Parse the output to get model names
-            models = []
-            for line in result.stdout.strip().split('\n')[1:]:  # Skip header line
-                if line:
-                    model_name = line.split()[0]  # First column is model name
-                    models.append(model_name)
-            
-            return Response({'models': models})
-            
+            models = model_catalog().models(refresh=request.query_params.get('refresh') in ('1', 'true'))
+            return Response({
+                'models': [model['name'] for model in models],
+                'details': models,
+                'catalog': model_catalog().stats(),
+            })
+
         except Exception as e:
+            logger.error(f"Error listing models: {str(e)}")
             return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'Failed to get models list'},
+                status=status.HTTP_502_BAD_GATEWAY
             )
\ No newline at end of file
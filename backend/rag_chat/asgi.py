@@ -0,0 +1,8 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rag_chat.settings')
+# Marks a server process, which warms its services up at startup (chat.apps.is_serving)
+os.environ.setdefault('RAGADMIN_SERVER', '1')
+
+application = get_asgi_application()
\ No newline at end of file
@@ -51,6 +51,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'rag_chat.wsgi.application'
+ASGI_APPLICATION = 'rag_chat.asgi.application'
 
 DATABASES = {
     'default': {
@@ -122,9 +123,105 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 CHROMA_DB_DIR = os.path.join(BASE_DIR, "chroma_db")
 # Ensure the ChromaDB directory exists
 os.makedirs(CHROMA_DB_DIR, exist_ok=True)
+# One embedding model per process, shared by indexing, retrieval and the context router:
+# 'fastembed' (ONNX Runtime on CPU; BAAI/bge-small-en-v1.5 is its int8-quantized export)
+# or 'sentence-transformers' (PyTorch). Changing the model requires re-indexing the documents.
+EMBEDDING_BACKEND = "fastembed"
+EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+EMBEDDING_BATCH_SIZE = 64
+EMBEDDING_THREADS = None  # Intra-op threads, None for the runtime default
+# Chunk embeddings keyed by content hash and embedding model, reused across uploads
+EMBEDDING_CACHE_PATH = os.path.join(BASE_DIR, "embedding_cache.sqlite3")
+# In-process LRU caches for query embeddings and retrieval results (retrieval results expire on
+# every add/delete, made by any worker process: the collection generation is kept in the database)
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+RETRIEVAL_CACHE_SIZE = 1024
+# Also keep query embeddings in the on-disk embedding cache, so they survive restarts
+QUERY_EMBEDDING_CACHE_ON_DISK = False
+# 'vector' (dense search), 'lexical' (FTS5 BM25, no embedding) or 'hybrid' (both, fused by
+# reciprocal rank over RETRIEVAL_HYBRID_CANDIDATES candidates from each side)
+RETRIEVAL_MODE = "hybrid"
+RETRIEVAL_HYBRID_CANDIDATES = 20
+RETRIEVAL_RRF_K = 60
+# Minimum BM25 score of a lexical hit (lexical and hybrid modes). BM25 is not normalised: chunks that
+# only share common words with the query score a few points, identifier and keyword matches above 10
+RETRIEVAL_LEXICAL_MIN_SCORE = 5.0
+# Prompt context: merged/deduplicated chunks, best first, up to this many (estimated) tokens.
+# CONTEXT_TOKEN_BUDGETS overrides the budget per Ollama model, e.g. {"llama3.1:8b": 3000}
+CONTEXT_TOKEN_BUDGET = 2048
+CONTEXT_TOKEN_BUDGETS = {}
+CONTEXT_DUPLICATE_THRESHOLD = 0.85  # Share of a passage's word trigrams already in a better one
+# Prompt history: the last CHAT_HISTORY_KEEP_TURNS turns verbatim, older turns folded into a
+# rolling summary (stored with the chat session) so the history stays under CHAT_HISTORY_TOKEN_BUDGET
+# tokens. Older messages are folded CHAT_HISTORY_SUMMARY_BATCH_TOKENS at a time, one LLM call each
+CHAT_HISTORY_KEEP_TURNS = 4
+CHAT_HISTORY_TOKEN_BUDGET = 1024
+CHAT_HISTORY_SUMMARY_TOKENS = 256
+CHAT_HISTORY_SUMMARY_BATCH_TOKENS = 2048
+CHAT_SUMMARY_CACHE_SIZE = 1024
+# Server-side chat histories (SQLite rows with an in-memory LRU of recent chats);
+# chats idle for longer than CHAT_SESSION_IDLE_SECONDS are deleted
+CHAT_SESSION_CACHE_SIZE = 256
+CHAT_SESSION_IDLE_SECONDS = 7 * 24 * 3600
+CHAT_SESSION_SWEEP_SECONDS = 3600
+# Reuse the answer to a near-duplicate question (cosine >= ANSWER_CACHE_SIMILARITY) over the
+# same retrieved chunks and model, for questions asked without history (first turn of a chat);
+# clients can send "noCache": true to force a fresh answer
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_SIZE = 512
+ANSWER_CACHE_TTL = 3600  # seconds
+ANSWER_CACHE_SIMILARITY = 0.95
 
 OLLAMA_MODEL = "llama3.1:8b"
 OLLAMA_HOST = "http://192.168.137.2:11434"  # Default Ollama host
+# One pooled keep-alive HTTP client per process talks to OLLAMA_HOST
+OLLAMA_HTTP_POOL_SIZE = 8
+OLLAMA_TIMEOUT = 300  # seconds
+# How long Ollama keeps a model in memory after a request, overridable per model
+OLLAMA_KEEP_ALIVE = "30m"
+OLLAMA_KEEP_ALIVE_PER_MODEL = {}
+# Models loaded into Ollama in the background at startup
+OLLAMA_PRELOAD_MODELS = [OLLAMA_MODEL]
+# Installed-model listing (/api/tags): fresh for MODEL_CATALOG_TTL seconds, then served stale
+# for up to MODEL_CATALOG_MAX_STALE more while it is refreshed in the background
+MODEL_CATALOG_TTL = 30
+MODEL_CATALOG_MAX_STALE = 600
+# Services are built on first use; a server process (chat.apps.is_serving) also builds them, and preloads
+# OLLAMA_PRELOAD_MODELS, in the background at startup (see `manage.py warmup`)
+WARMUP_ON_STARTUP = True
+# Maximum number of warm chat services (one per Ollama model) kept in memory
+CHAT_SERVICE_POOL_SIZE = 3
+# Concurrent generations sent to OLLAMA_HOST; extra chats wait in a queue of OLLAMA_MAX_QUEUE
+# and get an SSE error event beyond it
+OLLAMA_MAX_CONCURRENCY = 4
+OLLAMA_MAX_QUEUE = 32
+OLLAMA_QUEUE_TIMEOUT = 120  # Seconds a queued chat waits for a slot
+
+# Context router: 'embedding' decides locally from the query embedding and only asks
+# the LLM when the margin is below CHAT_ROUTER_CONFIDENCE, 'llm' always asks the LLM
+CHAT_CONTEXT_ROUTER = "embedding"
+CHAT_ROUTER_CONFIDENCE = 0.05
+CHAT_ROUTER_CACHE_SIZE = 1024
+
+# Log chat payloads (history, retrieved chunks, answer) to the 'chat.payloads' logger at DEBUG,
+# for DEBUG_PAYLOAD_SAMPLE_RATE of the requests. Stage timings are always on /api/metrics/
+DEBUG_PAYLOAD_LOGGING = False
+DEBUG_PAYLOAD_SAMPLE_RATE = 0.01
+
+# Background ingestion of uploads
+INGEST_WORKERS = 2
+INGEST_EMBED_BATCH_SIZE = 256  # Chunks embedded and added per vector store call
+INGEST_JOB_HISTORY = 200  # Finished jobs kept for /api/jobs/<id>/
+# PDF page ranges are extracted on a process pool shared by all ingestion jobs
+EXTRACTION_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+EXTRACTION_PAGES_PER_TASK = 8
+
+# Document list pages (/api/documents/?limit=) and content range reads (/api/documents/<id>/content/)
+DOCUMENT_LIST_PAGE_SIZE = 50
+DOCUMENT_LIST_MAX_PAGE_SIZE = 200
+DOCUMENT_CONTENT_BLOCK_CHARS = 65536  # Default JSON range, and block size of streamed reads
+DOCUMENT_CONTENT_MAX_CHARS = 1048576  # Largest range returned as JSON
+
 CHROMA_SETTINGS = {
     "persist_directory": CHROMA_DB_DIR,
     "anonymized_telemetry": False
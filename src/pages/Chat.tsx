@@ -7,6 +7,7 @@ import ChatSidebar from '../components/ChatSidebar';
 import ModelSidebar from '../components/ModelSidebar';
 import { App } from 'antd';
 import '../styles/chat.css';
+import { sseToTextResponse } from '../utils/sse';
 
 interface ChatSession {
   id: string;
@@ -147,6 +148,12 @@ const Chat: React.FC = () => {
   const handleModelChange = (model: string) => {
     setCurrentModel(model);
     localStorage.setItem('selected_model', model);
+    // Have Ollama load the model while the user types
+    fetch(`${import.meta.env.VITE_BACKEND_URL}/api/models/preload/`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ model }),
+    }).catch(error => console.error('Error preloading model:', error));
     if (chatId) {
       setChatSessions(prev => {
         const updated = prev.map(session =>
@@ -221,21 +228,29 @@ const Chat: React.FC = () => {
         role: msg.role === 'assistant' ? 'ai' : 'human'
       }));
       
-      const response = await fetch(`${import.meta.env.VITE_BACKEND_URL}/api/chat/`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ 
-          message: lastMessage,
-          chatId: chatId,
-          history: history,
-          model: currentModel
-        }),
-      });
+      const postChat = (payload: Record<string, unknown>) =>
+        fetch(`${import.meta.env.VITE_BACKEND_URL}/api/chat/`, {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({ 
+            message: lastMessage,
+            chatId: chatId,
+            model: currentModel,
+            ...payload
+          }),
+        });
+
+      // The server keeps the chat history: only send how many messages we already have
+      let response = await postChat({ cursor: history.length });
+      if (response.status === 409) {
+        // Server copy missing or out of sync, send the full history once
+        response = await postChat({ history: history });
+      }
 
       if (!response.ok) throw new Error('Network response was not ok');
-      return response;
+      return sseToTextResponse(response);
 
     } catch (error) {
       console.error('Error sending message:', error);
@@ -16,19 +16,33 @@ interface DocumentContent {
   content: string;
   name: string;
   file_type: string;
+  start: number;
+  end: number;
+  total_length: number;
+  next_start: number | null;
+}
+
+interface DocumentPage {
+  results: Document[];
+  next_cursor: string | null;
 }
 
 const Documents: React.FC = () => {
   const [documents, setDocuments] = useState<Document[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [selectedId, setSelectedId] = useState<string | null>(null);
   const [isModalVisible, setIsModalVisible] = useState(false);
   const [selectedDocument, setSelectedDocument] = useState<DocumentContent | null>(null);
   const [loading, setLoading] = useState(false);
   const { message } = App.useApp();
 
-  const fetchDocuments = async () => {
+  const fetchDocuments = async (cursor?: string) => {
     try {
-      const response = await axios.get(`${import.meta.env.VITE_BACKEND_URL}/api/documents/`);
-      setDocuments(response.data);
+      const response = await axios.get<DocumentPage>(`${import.meta.env.VITE_BACKEND_URL}/api/documents/`, {
+        params: cursor ? { cursor } : {},
+      });
+      setDocuments(previous => cursor ? [...previous, ...response.data.results] : response.data.results);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Error fetching documents:', error);
       message.error('Failed to fetch documents');
@@ -58,6 +72,7 @@ const Documents: React.FC = () => {
     try {
       const response = await axios.get(`${import.meta.env.VITE_BACKEND_URL}/api/documents/${id}/content/`);
       setSelectedDocument(response.data);
+      setSelectedId(id);
       setIsModalVisible(true);
     } catch (error) {
       console.error('Error fetching document content:', error);
@@ -67,6 +82,23 @@ const Documents: React.FC = () => {
     }
   };
 
+  // Large documents are read one block at a time, from where the previous one ended
+  const handleLoadMoreContent = async () => {
+    if (!selectedDocument || selectedDocument.next_start === null || !selectedId) return;
+    setLoading(true);
+    try {
+      const response = await axios.get(`${import.meta.env.VITE_BACKEND_URL}/api/documents/${selectedId}/content/`, {
+        params: { start: selectedDocument.next_start },
+      });
+      setSelectedDocument({ ...response.data, content: selectedDocument.content + response.data.content });
+    } catch (error) {
+      console.error('Error fetching document content:', error);
+      message.error('Failed to fetch document content');
+    } finally {
+      setLoading(false);
+    }
+  };
+
   const columns = [
     {
       title: 'Name',
@@ -133,7 +165,12 @@ const Documents: React.FC = () => {
   return (
     <div className="max-w-4xl mx-auto p-4">
       <h1 className="text-2xl font-bold mb-4">Documents</h1>
-      <Table columns={columns} dataSource={documents} rowKey="id" />
+      <Table columns={columns} dataSource={documents} rowKey="id" pagination={false} />
+      {nextCursor && (
+        <div className="flex justify-center mt-4">
+          <Button onClick={() => fetchDocuments(nextCursor)}>Load more</Button>
+        </div>
+      )}
       
       <Modal
         title={selectedDocument?.name}
@@ -146,6 +183,13 @@ const Documents: React.FC = () => {
           <Paragraph className="whitespace-pre-wrap">
             {selectedDocument?.content}
           </Paragraph>
+          {selectedDocument?.next_start != null && (
+            <div className="flex justify-center">
+              <Button onClick={handleLoadMoreContent} loading={loading}>
+                Load more ({selectedDocument.end} / {selectedDocument.total_length} characters)
+              </Button>
+            </div>
+          )}
         </div>
       </Modal>
     </div>
@@ -9,6 +9,16 @@ const InsertData: React.FC = () => {
   const [fileList, setFileList] = useState<any[]>([]);
   const { message } = App.useApp();
 
+  // Uploads are indexed in the background, poll the job until it finishes
+  const waitForIngestion = async (jobId: string) => {
+    while (true) {
+      const { data } = await axios.get(`${import.meta.env.VITE_BACKEND_URL}/api/jobs/${jobId}/`);
+      if (data.stage === 'done') return data;
+      if (data.stage === 'failed') throw { response: { data: { error: data.error } } };
+      await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+  };
+
   const handleUpload = async (options: any) => {
     const { file, onSuccess, onError } = options;
 
@@ -21,6 +31,10 @@ const InsertData: React.FC = () => {
           'Content-Type': 'multipart/form-data',
         },
       });
+      // Identical files are linked to the existing document, nothing to wait for
+      if (response.data.job_id) {
+        await waitForIngestion(response.data.job_id);
+      }
       message.success(`${file.name} file uploaded successfully.`);
       onSuccess('OK');
     } catch (err: any) {
@@ -0,0 +1,58 @@
+export interface ChatStreamDone {
+  sources: Record<string, unknown>[];
+  used_context: boolean;
+  [key: string]: unknown;
+}
+
+// Convert the backend's text/event-stream into the plain text stream ProChat expects.
+export const sseToTextResponse = (
+  response: Response,
+  onDone?: (data: ChatStreamDone) => void
+): Response => {
+  if (!response.body) return response;
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  const encoder = new TextEncoder();
+  let buffer = '';
+
+  const stream = new ReadableStream<Uint8Array>({
+    async pull(controller) {
+      const { done, value } = await reader.read();
+      if (done) {
+        controller.close();
+        return;
+      }
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split('\n\n');
+      buffer = events.pop() || '';
+
+      for (const raw of events) {
+        let event = 'message';
+        const dataLines: string[] = [];
+        for (const line of raw.split('\n')) {
+          if (line.startsWith('event:')) event = line.slice(6).trim();
+          else if (line.startsWith('data:')) dataLines.push(line.slice(5).trimStart());
+        }
+        if (dataLines.length === 0) continue;
+        const data = JSON.parse(dataLines.join('\n'));
+
+        if (event === 'token') {
+          controller.enqueue(encoder.encode(data));
+        } else if (event === 'done') {
+          onDone?.(data);
+        } else if (event === 'error') {
+          controller.enqueue(encoder.encode(data.error));
+        }
+      }
+    },
+    cancel() {
+      reader.cancel();
+    },
+  });
+
+  return new Response(stream, {
+    status: response.status,
+    headers: { 'Content-Type': 'text/plain; charset=utf-8' },
+  });
+};